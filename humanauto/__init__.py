@@ -1,2 +1,27 @@
-from .actions import press, wait, write, click, scroll, run, say, get_copied_value, copy_var_and_paste
-from .helpers import execute_click_sequence,find_closest_match,get_text_boxes, click_on_text, wait_until_appears_text, wait_until_appears_image, click_on_image, scroll_until_appears_image, chatDuckAIJson
\ No newline at end of file
+import importlib
+
+# Names are resolved on first use, so importing one piece (e.g. the JSON
+# parser) doesn't pull in pyautogui, which needs an X display.
+_EXPORTS = {
+    ".actions": ["press", "wait", "write", "click", "scroll", "run", "say", "get_copied_value",
+                 "copy_var_and_paste"],
+    ".helpers": ["execute_click_sequence", "find_closest_match", "get_text_boxes", "click_on_text",
+                 "wait_until_appears_text", "wait_until_appears_image", "click_on_image",
+                 "scroll_until_appears_image", "chatDuckAIJson", "DuckAISession"],
+    ".displays": ["DisplayPool"],
+    ".matcher": ["TemplateMatcher", "locate_on_screen"],
+    ".ocr": ["get_ocr_engine", "make_engine"],
+    ".screen": ["ScreenState", "get_screen_state"],
+    ".parsing": ["extract_json", "schema_errors", "split_valid"],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module 'humanauto' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
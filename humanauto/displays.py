@@ -0,0 +1,163 @@
+from concurrent.futures import Future
+import multiprocessing
+import subprocess
+import threading
+import itertools
+import shutil
+import time
+import os
+
+# ========================================
+# PARALLEL GUI SESSIONS ON VIRTUAL DISPLAYS
+# ========================================
+# pyautogui and the clipboard belong to one X display, so one screen can only
+# drive one chat at a time. Every display here gets its own Xvfb server, its
+# own worker process (pyautogui, xclip and Chrome all follow $DISPLAY) and
+# its own Chrome profile.
+GUI_DISPLAYS = int(os.getenv("GUI_DISPLAYS", "4"))
+FIRST_DISPLAY = int(os.getenv("FIRST_DISPLAY", "99"))
+DISPLAY_RESOLUTION = os.getenv("DISPLAY_RESOLUTION", "1920x1080x24")
+# how long a caller waits for one prompt before giving up on its worker
+DISPLAY_TASK_TIMEOUT = float(os.getenv("DISPLAY_TASK_TIMEOUT", "600"))
+# the chat page; kept here (not in helpers) so the parent process can build the
+# workers' Chrome command without importing pyautogui
+DUCKAI_URL = "https://duckduckgo.com/?q=DuckDuckGo+AI+Chat&ia=chat&duckai=1"
+
+
+def _free_display(start: int) -> int:
+    number = start
+    while os.path.exists(f"/tmp/.X{number}-lock") or os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        number += 1
+    return number
+
+
+def start_xvfb(number: int, resolution: str = DISPLAY_RESOLUTION, timeout: float = 10) -> subprocess.Popen:
+    """Start Xvfb on :number and wait until its socket is up."""
+    if not shutil.which("Xvfb"):
+        raise RuntimeError("Xvfb is not installed (apt install xvfb)")
+    process = subprocess.Popen(
+        ["Xvfb", f":{number}", "-screen", "0", resolution, "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if process.poll() is not None or time.time() > deadline:
+            process.kill()
+            raise RuntimeError(f"Xvfb :{number} did not start")
+        time.sleep(0.05)
+    return process
+
+
+def _chrome_profile(number: int) -> str:
+    return os.path.join("/tmp", f"duckai-display-{number}")
+
+
+def _chrome_command(number: int, resolution: str) -> str:
+    width, height = resolution.split("x")[:2]
+    # own profile so Chrome doesn't hand the window to an instance on another display;
+    # the chat URL on the command line because there's no window manager to give the
+    # new window keyboard focus before Chrome is ready for typing;
+    # backgrounded because a fresh instance doesn't return like a running one does
+    return (f"google-chrome --incognito --no-first-run --no-default-browser-check "
+            f"--user-data-dir={_chrome_profile(number)} --window-position=0,0 --window-size={width},{height} "
+            f"'{DUCKAI_URL}' >/dev/null 2>&1 &")
+
+
+def _display_worker(display: str, chrome_command: str, chrome_profile: str, tasks, results):
+    # set before the first pyautogui import so it binds to this display; nothing
+    # imported while the spawned child starts up (this module, main.py) may load it
+    os.environ["DISPLAY"] = display
+    os.environ["DUCKAI_CHROME"] = chrome_command
+    os.environ["DUCKAI_CHROME_PROFILE"] = chrome_profile
+    from humanauto.helpers import DuckAISession
+
+    session = DuckAISession()
+    print(f"[+] Duck.ai worker ready on {display}")
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, prompt, schema, expect = task
+        try:
+            data = session.ask(prompt, schema=schema, expect=expect)
+        except Exception as e:
+            print(f"[-] Duck.ai worker on {display} failed: {e}")
+            data = None
+        results.put((task_id, data))
+    session.close()
+
+
+class DisplayPool:
+    """
+    A Duck.ai session per Xvfb display; `ask` hands the prompt to whichever
+    worker is idle and blocks until its reply arrives. Safe to call from
+    several threads at once.
+    """
+
+    def __init__(self, size: int = GUI_DISPLAYS, first_display: int = FIRST_DISPLAY,
+                 resolution: str = DISPLAY_RESOLUTION):
+        self.size = max(1, size)
+        ctx = multiprocessing.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._servers = []
+        self._workers = []
+
+        number = first_display
+        for _ in range(self.size):
+            number = _free_display(number)
+            self._servers.append(start_xvfb(number, resolution))
+            self._workers.append(self._spawn_worker(ctx, number, resolution))
+            number += 1
+
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+        print(f"[+] {self.size} virtual display(s) started")
+
+    def _spawn_worker(self, ctx, number: int, resolution: str):
+        args = (f":{number}", _chrome_command(number, resolution), _chrome_profile(number),
+                self._tasks, self._results)
+        worker = ctx.Process(target=_display_worker, args=args, daemon=True)
+        worker.start()
+        return worker
+
+    def _read_results(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                break
+            task_id, data = item
+            with self._lock:
+                future = self._pending.pop(task_id, None)
+            if future is not None:
+                future.set_result(data)
+
+    def ask(self, prompt: str, schema: dict = None, expect: type = dict, timeout: float = DISPLAY_TASK_TIMEOUT):
+        """Send one prompt to the next idle display; returns the parsed reply or None."""
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            self._pending[task_id] = future
+        self._tasks.put((task_id, prompt, schema, expect))
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            print(f"[-] No reply from the display workers: {e}")
+            with self._lock:
+                self._pending.pop(task_id, None)
+            return None
+
+    def close(self):
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put(None)
+        for server in self._servers:
+            server.terminate()
+        self._workers, self._servers = [], []
@@ -1,12 +1,20 @@
 import pyautogui
-import pytesseract
 from PIL import Image
 import json
 import re
 import math
 import time
 import psutil, time
-from humanauto import *
+import subprocess
+import shutil
+import os
+from contextlib import contextmanager
+from .actions import press, wait, write, click, scroll, run, say, get_copied_value, copy_var_and_paste
+from .matcher import locate_on_screen
+from .ocr import get_ocr_engine
+from .screen import get_screen_state
+from .parsing import extract_json, schema_errors
+from .displays import DUCKAI_URL
 from typing import Any, Dict, List, Optional
 
 import pyperclip
@@ -15,23 +23,9 @@ def get_text_boxes(screenshot, min_conf=50):
     """
     Extract all text boxes with confidence >= min_conf (0-100).
     Returns list of dicts: {'text': str, 'x': int, 'y': int, 'w': int, 'h': int, 'conf': int}
+    Uses the shared OCR engine (see humanauto/ocr.py, OCR_ENGINE env var).
     """
-    data = pytesseract.image_to_data(screenshot, output_type=pytesseract.Output.DICT)
-    boxes = []
-    n_boxes = len(data['text'])
-    for i in range(n_boxes):
-        conf = int(data['conf'][i])
-        text = data['text'][i].strip()
-        if conf >= min_conf and text:
-            boxes.append({
-                'text': text,
-                'x': data['left'][i],
-                'y': data['top'][i],
-                'w': data['width'][i],
-                'h': data['height'][i],
-                'conf': conf
-            })
-    return boxes
+    return get_ocr_engine().boxes(screenshot, min_conf=min_conf)
 
 def find_closest_match(target_text, boxes, last_pos):
     """
@@ -69,6 +63,7 @@ def execute_click_sequence(steps_json):
     # Start from screen center if no prior click
     screen_w, screen_h = pyautogui.size()
     last_click_pos = (screen_w // 2, screen_h // 2)
+    screen = get_screen_state()
 
     for step in steps:
         target_text = step['text']
@@ -76,11 +71,8 @@ def execute_click_sequence(steps_json):
 
         print(f"\n🔍 Looking for text: '{target_text}'")
 
-        # Take full screenshot
-        screenshot = pyautogui.screenshot()
-
-        # Get all text boxes with confidence >= 50%
-        boxes = get_text_boxes(screenshot, min_conf=50)
+        # Text boxes with confidence >= 50% (only the parts of the screen that changed are re-read)
+        boxes = screen.boxes(min_conf=50)
 
         if not boxes:
             print("⚠️ No text detected on screen.")
@@ -124,8 +116,7 @@ def click_on_text(target_text, min_conf=40, sleep_after=0, last_pos=None):
 
     print(f"\n🎯 Searching for '{target_text}'...")
 
-    screenshot = pyautogui.screenshot()
-    boxes = get_text_boxes(screenshot, min_conf=min_conf)
+    boxes = get_screen_state().boxes(min_conf=min_conf)
 
     if not boxes:
         print("⚠️ No text detected on screen.")
@@ -191,7 +182,7 @@ def wait_until_appears_text(target_text, timeout=30, min_conf=50, interval=0.5,
         time.sleep(interval)
 
 
-def wait_until_appears_image(image_path, timeout=30, confidence=0.8, interval=0.5):
+def wait_until_appears_image(image_path, timeout=30, confidence=0.8, interval=0.5, region=None):
     """
     Wait until a specific image appears on the screen.
     
@@ -200,6 +191,7 @@ def wait_until_appears_image(image_path, timeout=30, confidence=0.8, interval=0.
         timeout (float): Maximum seconds to wait before giving up.
         confidence (float): Matching accuracy (0.8 = 80%)
         interval (float): Seconds between each check.
+        region (tuple): Optional (x, y, width, height) to search in.
     
     Returns:
         (x, y) center coordinates if found, or None if not found.
@@ -208,7 +200,7 @@ def wait_until_appears_image(image_path, timeout=30, confidence=0.8, interval=0.
     print(f"⏳ Waiting for image '{image_path}' to appear (timeout {timeout}s)...")
     while True:
         try:
-            location = pyautogui.locateCenterOnScreen(image_path, confidence=confidence)
+            location = locate_on_screen(image_path, confidence=confidence, region=region)
             if location:
                 print(f"✅ Image '{image_path}' appeared at {location}")
                 return location
@@ -220,7 +212,7 @@ def wait_until_appears_image(image_path, timeout=30, confidence=0.8, interval=0.
         time.sleep(interval)
 
 
-def click_on_image(image_path, timeout=30, confidence=0.8, move_duration=0.3):
+def click_on_image(image_path, timeout=30, confidence=0.8, move_duration=0.3, interval=0.5, region=None):
     """
     Waits for an image to appear on screen and clicks it once found.
     - Smoothly moves mouse to image before clicking
@@ -232,7 +224,7 @@ def click_on_image(image_path, timeout=30, confidence=0.8, move_duration=0.3):
 
     while True:
         try:
-            location = pyautogui.locateCenterOnScreen(image_path, confidence=confidence)
+            location = locate_on_screen(image_path, confidence=confidence, region=region)
             if location:
                 print(f"✅ Image '{image_path}' found at {location}, moving and clicking...")
                 pyautogui.moveTo(location.x, location.y, duration=move_duration)
@@ -248,11 +240,11 @@ def click_on_image(image_path, timeout=30, confidence=0.8, move_duration=0.3):
             print(f"❌ Timeout: Image '{image_path}' not found within {timeout}s.")
             return False
 
-        time.sleep(0.5)
+        time.sleep(interval)
 
 
 
-def scroll_until_appears_image(image_path, timeout=30, confidence=0.8, interval=2, scroll_amount=-10):
+def scroll_until_appears_image(image_path, timeout=30, confidence=0.8, interval=2, scroll_amount=-10, region=None):
     """
     Scrolls the screen until a specific image appears or timeout is reached.
     
@@ -262,6 +254,7 @@ def scroll_until_appears_image(image_path, timeout=30, confidence=0.8, interval=
         confidence (float): Matching accuracy (0.8 = 80%)
         interval (float): Seconds between scroll checks.
         scroll_amount (int): Scroll amount (negative = down, positive = up)
+        region (tuple): Optional (x, y, width, height) to search in.
     
     Returns:
         (x, y): center coordinates if found, or None if not found.
@@ -271,7 +264,7 @@ def scroll_until_appears_image(image_path, timeout=30, confidence=0.8, interval=
 
     while True:
         try:
-            location = pyautogui.locateCenterOnScreen(image_path, confidence=confidence)
+            location = locate_on_screen(image_path, confidence=confidence, region=region)
             if location:
                 print(f"✅ Image '{image_path}' found at {location}")
                 return location
@@ -287,50 +280,289 @@ def scroll_until_appears_image(image_path, timeout=30, confidence=0.8, interval=
         pyautogui.scroll(scroll_amount)
         time.sleep(interval)
 
-def chatDuckAIJson(prompt:str):
-    press("Win","9")
-    wait(0.5)
-
-    run("google-chrome --incognito")
-    wait(0.5)
-    write("https://duckduckgo.com/?q=DuckDuckGo+AI+Chat&ia=chat&duckai=1", interval=0.01)
-    press("Enter")
-    wait(1)
-    wait_until_appears_image("./assets/ocr/duckai_loaded.png")
-    wait(0.5)
-    click_on_image("./assets/ocr/duckai_agree.png")
-    wait(0.5)
-    click_on_image("./assets/ocr/duckai_chat.png")
-    wait(0.5)
-    copy_var_and_paste(prompt)
-    wait(1)
-    press("Enter")
-    wait(0.5)
-    press("Enter")
-    wait(0.5)
-    wait_until_appears_image("./assets/ocr/duckai_chat2.png")
-    wait(0.5)
-    click_on_image("./assets/ocr/duckai_random.png")
-    wait(0.5)
-    pyautogui.moveTo(960,540)
-    wait(0.5)
-    press("Ctrl", "f")
-    wait(0.5)
-    write("copy code")
-    wait(0.5)
-    isExist = wait_until_appears_image("./assets/ocr/duckai_copy_code2.png", timeout=10)
-    if isExist == None:
-        wait(0.5)
-        press("Alt", "F4")
-        wait(0.5)
-        chatDuckAIJson(prompt)
-        wait(0.5)
-    else:
-        wait(3)
-        click_on_image("./assets/ocr/duckai_copy_code2.png")
-        wait(2)
-        copied_text = get_copied_value()
+# ========================================
+# CONDITION WAITS
+# ========================================
+# how the chat browser is launched (virtual displays pass their own profile and window size)
+DUCKAI_CHROME = os.getenv("DUCKAI_CHROME", "google-chrome --incognito")
+# set when the chat browser runs on its own profile (virtual displays); there is no
+# window manager to honour Alt+F4 there, so the session kills that Chrome instead
+DUCKAI_CHROME_PROFILE = os.getenv("DUCKAI_CHROME_PROFILE", "")
+# poll interval for the condition waits below
+POLL_INTERVAL = 0.1
+# how long one GUI step may wait for its condition
+STEP_TIMEOUT = 30
+# how long Duck.ai may take to answer
+REPLY_TIMEOUT = 120
+
+
+def wait_until(condition, timeout=STEP_TIMEOUT, interval=POLL_INTERVAL):
+    """
+    Poll condition() until it returns something truthy.
+
+    Returns:
+        The truthy value, or None on timeout.
+    """
+    deadline = time.time() + timeout
+    while True:
+        value = condition()
+        if value:
+            return value
+        if time.time() > deadline:
+            return None
+        time.sleep(interval)
+
+
+def active_window_title():
+    """Title of the focused window via xdotool, or None when it can't be read."""
+    if not shutil.which("xdotool"):
+        return None
+    try:
+        result = subprocess.run(["xdotool", "getactivewindow", "getwindowname"],
+                                capture_output=True, text=True, timeout=1)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # no window manager (e.g. a bare Xvfb display) means no active window to ask about
+    return result.stdout.strip() if result.returncode == 0 and result.stdout.strip() else None
+
+
+def wait_for_window(title_part, timeout=STEP_TIMEOUT, fallback=0.5):
+    """
+    Wait until the focused window's title contains title_part.
+    Without a window manager there is no focused window, so wait for a visible
+    window of that class to be mapped instead; without xdotool at all, just
+    settle for `fallback` seconds.
+    """
+    if not shutil.which("xdotool"):
+        time.sleep(fallback)
+        return True
+    if active_window_title() is None:
+        try:
+            result = subprocess.run(["xdotool", "search", "--sync", "--onlyvisible", "--class", title_part],
+                                    capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        except (OSError, subprocess.SubprocessError):
+            time.sleep(fallback)
+            return True
+        return result.returncode == 0 or None
+    return wait_until(lambda: title_part.lower() in (active_window_title() or "").lower(), timeout=timeout)
+
+
+def wait_for_clipboard_change(previous, timeout=STEP_TIMEOUT):
+    """Wait until the clipboard holds something other than `previous`; returns the new value."""
+    def changed():
+        value = get_copied_value()
+        return value if value and value != previous else None
+
+    return wait_until(changed, timeout=timeout)
+
+
+def wait_until_image_settles(image_path, timeout=STEP_TIMEOUT, confidence=0.8, region=None):
+    """Wait until an image is found at the same spot twice in a row (page done scrolling)."""
+    state = {"last": None}
+
+    def settled():
+        try:
+            location = locate_on_screen(image_path, confidence=confidence, region=region)
+        except pyautogui.ImageNotFoundException:
+            location = None
+        stable = location is not None and location == state["last"]
+        state["last"] = location
+        return location if stable else None
+
+    return wait_until(settled, timeout=timeout)
+
+
+class StepTimer:
+    """Collects how long each named GUI step took and prints one report line."""
+
+    def __init__(self, label):
+        self.label = label
+        self.steps = []
+        self.started = time.time()
+
+    @contextmanager
+    def step(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.time() - start))
+
+    def report(self):
+        parts = " · ".join(f"{name} {seconds:.1f}s" for name, seconds in self.steps)
+        print(f"⏱️ {self.label}: {parts} · total {time.time() - self.started:.1f}s")
+
+
+class StepTimeout(Exception):
+    """A GUI step's condition never became true."""
+
+
+class InvalidReply(Exception):
+    """The copied reply held no usable JSON or failed the schema."""
+
+
+def _require(value, what):
+    if not value:
+        raise StepTimeout(what)
+    return value
+
+
+# ========================================
+# DUCK.AI CHAT
+# ========================================
+class DuckAISession:
+    """
+    One incognito Duck.ai window that is kept open across prompts.
+
+    The browser is launched and the terms are accepted once; each prompt then
+    reloads the chat URL in the same tab, which starts a fresh conversation.
+    If the chat page doesn't come back (window closed, browser crashed) the
+    session bootstraps again from scratch.
+    """
+
+    def __init__(self):
+        self.is_open = False
+
+    def _bootstrap(self, timer):
+        with timer.step("launch"):
+            press("Win","9")
+            run(DUCKAI_CHROME)
+            _require(wait_for_window("Chrome"), "browser window")
+        self.is_open = True
+        # a launch command that already carries the chat URL opens it by itself
+        self._load_chat(timer, accept_terms=True, navigate=DUCKAI_URL not in DUCKAI_CHROME)
+
+    def _load_chat(self, timer, accept_terms=False, navigate=True):
+        with timer.step("load"):
+            if navigate:
+                press("Ctrl", "l")
+                write(DUCKAI_URL, interval=0.01)
+                press("Enter")
+            _require(wait_until_appears_image("./assets/ocr/duckai_loaded.png", interval=POLL_INTERVAL),
+                     "chat page")
+            if accept_terms:
+                _require(click_on_image("./assets/ocr/duckai_agree.png", interval=POLL_INTERVAL), "terms button")
+            else:
+                # the terms dialog only shows once per incognito window
+                click_on_image("./assets/ocr/duckai_agree.png", timeout=0.5, interval=POLL_INTERVAL)
+            _require(click_on_image("./assets/ocr/duckai_chat.png", interval=POLL_INTERVAL), "chat box")
+
+    def _new_chat(self, timer):
+        """Fresh conversation in the open window, or a full bootstrap if it's gone."""
+        if not self.is_open:
+            return self._bootstrap(timer)
+        title = active_window_title()
+        if title is not None and "chrome" not in title.lower():
+            print("⚠️ Duck.ai window is gone, starting a new one...")
+            self.is_open = False
+            return self._bootstrap(timer)
+        try:
+            self._load_chat(timer)
+        except StepTimeout:
+            print("⚠️ Duck.ai window stopped responding, starting a new one...")
+            self.close()
+            self._bootstrap(timer)
+
+    def _ask_once(self, prompt, timer, schema=None, expect=dict):
+        self._new_chat(timer)
+        with timer.step("prompt"):
+            copy_var_and_paste(prompt, delay=0.05)
+            press("Enter")
+            press("Enter")
+        with timer.step("reply"):
+            _require(wait_until_appears_image("./assets/ocr/duckai_chat2.png", timeout=REPLY_TIMEOUT,
+                                              interval=POLL_INTERVAL), "reply")
+            click_on_image("./assets/ocr/duckai_random.png", interval=POLL_INTERVAL)
+        with timer.step("copy"):
+            pyautogui.moveTo(960,540)
+            press("Ctrl", "f")
+            write("copy code")
+            location = _require(wait_until_image_settles("./assets/ocr/duckai_copy_code2.png", timeout=10),
+                                "copy code button")
+            press("Escape")
+            sentinel = f"__duckai_{time.time()}__"
+            pyperclip.copy(sentinel)
+            pyautogui.moveTo(location.x, location.y, duration=0.1)
+            pyautogui.click()
+            copied_text = _require(wait_for_clipboard_change(sentinel, timeout=5), "copied reply")
         print(copied_text)
-        press("Alt", "F4")
-        data = json.loads(copied_text)
+        data = extract_json(copied_text, expect=expect)
+        if data is None:
+            raise InvalidReply(f"no JSON {'array' if expect is list else 'object'} in the reply")
+        errors = schema_errors(data, schema) if schema and isinstance(data, dict) else []
+        if errors:
+            raise InvalidReply(", ".join(errors))
         return data
+
+    def ask(self, prompt, retries=2, schema=None, expect=dict):
+        """
+        Send one prompt in a fresh conversation and return the JSON reply.
+
+        Args:
+            prompt (str): The prompt to send.
+            retries (int): How many more times to try after a timeout or an invalid reply.
+            schema (dict): Required keys of the reply (see humanauto/parsing.py);
+                a reply missing them is asked again.
+            expect (type): dict for an object reply, list for an array (batched scoring).
+
+        Returns:
+            dict or None: The parsed reply, None if every attempt failed.
+        """
+        for attempt in range(retries + 1):
+            timer = StepTimer("duck.ai")
+            try:
+                data = self._ask_once(prompt, timer, schema=schema, expect=expect)
+                timer.report()
+                return data
+            except StepTimeout as e:
+                print(f"⚠️ Duck.ai step timed out waiting for {e} (attempt {attempt + 1}/{retries + 1})")
+                timer.report()
+                self.close()
+            except InvalidReply as e:
+                # the window is fine, the next attempt starts a new chat in it
+                print(f"⚠️ Unusable Duck.ai reply: {e} (attempt {attempt + 1}/{retries + 1})")
+                timer.report()
+        return None
+
+    def close(self):
+        if self.is_open:
+            if DUCKAI_CHROME_PROFILE:
+                # no shell in between: its command line would match the pattern too
+                pattern = f"--user-data-dir={DUCKAI_CHROME_PROFILE}"
+                subprocess.run(["pkill", "-f", "--", pattern])
+                wait_until(lambda: subprocess.run(["pgrep", "-f", "--", pattern],
+                                                  capture_output=True).returncode != 0, timeout=10)
+            else:
+                press("Alt", "F4")
+            self.is_open = False
+
+
+def chatDuckAIJson(prompt:str, retries=2, session=None, schema=None, expect=dict):
+    """
+    Ask Duck.ai and return the JSON it answers with.
+
+    Every step waits on its own condition (window focused, template visible,
+    clipboard changed) instead of a fixed sleep, and a timing line is printed
+    per prompt.
+
+    Args:
+        prompt (str): The prompt to send.
+        retries (int): How many times to start over when a step times out
+            or the reply is unusable.
+        session (DuckAISession): Keep using this open window. Without one a
+            new incognito window is opened and closed for this prompt.
+        schema (dict): Required keys of the reply; replies without them are asked again.
+        expect (type): dict for an object reply, list for an array.
+
+    Returns:
+        dict, list or None: The parsed reply, None if every attempt failed.
+    """
+    if session is not None:
+        return session.ask(prompt, retries=retries, schema=schema, expect=expect)
+    session = DuckAISession()
+    try:
+        return session.ask(prompt, retries=retries, schema=schema, expect=expect)
+    finally:
+        session.close()
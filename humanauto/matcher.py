@@ -0,0 +1,142 @@
+from PIL import Image
+import pyautogui
+
+# ========================================
+# IN-MEMORY TEMPLATE MATCHER
+# ========================================
+# pyautogui.locateCenterOnScreen re-reads the PNG and scans the whole screen at
+# full resolution on every poll. Here templates are loaded once, the last hit
+# is tried first, the rest of the screen is scanned at reduced size, and a
+# frame identical to the previous poll isn't matched again at all.
+
+# the coarse pass works on frames shrunk by this factor
+COARSE_FACTOR = 2
+# coarse matches are blurrier, so accept them a little below the requested confidence
+COARSE_SLACK = 0.1
+# pixels around a previous hit / coarse hit that are searched at full resolution
+HINT_MARGIN = 40
+# templates smaller than this (after shrinking) are only matched at full resolution
+MIN_COARSE_SIDE = 12
+
+
+class Template:
+    """A template image in grayscale, at full and at coarse size."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.full = Image.open(path).convert("L")
+        self.full.load()
+        width, height = self.full.size
+        if min(width, height) // COARSE_FACTOR >= MIN_COARSE_SIDE:
+            self.coarse = self.full.reduce(COARSE_FACTOR)
+        else:
+            self.coarse = None
+
+
+def _match(needle, haystack, confidence):
+    """(left, top, width, height) of needle inside haystack, or None."""
+    if needle.size[0] > haystack.size[0] or needle.size[1] > haystack.size[1]:
+        return None
+    try:
+        return pyautogui.locate(needle, haystack, confidence=max(confidence, 0.1))
+    except pyautogui.ImageNotFoundException:
+        return None
+
+
+def _padded(box, margin, size):
+    left, top, width, height = box
+    return (max(0, left - margin), max(0, top - margin),
+            min(size[0], left + width + margin), min(size[1], top + height + margin))
+
+
+class TemplateMatcher:
+    """
+    Finds template images on screen.
+
+    Per (template, region) it remembers where the template was last found and
+    the hash of the last frame it looked at together with the answer, so
+    polling an unchanged screen costs one screenshot and one hash.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._hints = {}
+        self._last_frames = {}
+
+    def template(self, path: str) -> Template:
+        if path not in self._templates:
+            self._templates[path] = Template(path)
+        return self._templates[path]
+
+    def locate(self, image_path: str, confidence: float = 0.8, region=None):
+        """
+        Center of image_path on screen as a pyautogui Point, or None.
+
+        Args:
+            image_path (str): Template image (loaded once and kept in memory).
+            confidence (float): Matching accuracy (0.8 = 80%).
+            region (tuple): Optional (x, y, width, height) to search in.
+        """
+        template = self.template(image_path)
+        frame = pyautogui.screenshot(region=region).convert("L")
+        key = (image_path, region, confidence)
+        frame_hash = hash(frame.tobytes())
+        last = self._last_frames.get(key)
+        if last is not None and last[0] == frame_hash:
+            return last[1]
+
+        box = self._search(template, frame, confidence, key)
+        location = None
+        if box is not None:
+            self._hints[key] = box
+            offset_x, offset_y = (region[0], region[1]) if region else (0, 0)
+            center = pyautogui.center(box)
+            location = pyautogui.Point(center.x + offset_x, center.y + offset_y)
+        self._last_frames[key] = (frame_hash, location)
+        return location
+
+    def _search(self, template: Template, frame, confidence: float, key):
+        # 1. where it was last time
+        hint = self._hints.get(key)
+        if hint is not None:
+            box = self._match_in(template.full, frame, _padded(hint, HINT_MARGIN, frame.size), confidence)
+            if box is not None:
+                return box
+
+        if template.coarse is None:
+            return _match(template.full, frame, confidence)
+
+        # 2. coarse pass over the whole frame, then confirm at full size around the hit
+        coarse = _match(template.coarse, frame.reduce(COARSE_FACTOR), confidence - COARSE_SLACK)
+        if coarse is not None:
+            scaled = tuple(value * COARSE_FACTOR for value in coarse)
+            box = self._match_in(template.full, frame, _padded(scaled, HINT_MARGIN, frame.size), confidence)
+            if box is not None:
+                return box
+
+        # 3. thin templates (text buttons) can blur away at half size, so a
+        # coarse miss isn't trusted: one full-resolution pass decides
+        return _match(template.full, frame, confidence)
+
+    @staticmethod
+    def _match_in(needle, frame, area, confidence):
+        box = _match(needle, frame.crop(area), confidence)
+        if box is None:
+            return None
+        left, top, width, height = box
+        return (left + area[0], top + area[1], width, height)
+
+
+_matcher = None
+
+
+def get_matcher() -> TemplateMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = TemplateMatcher()
+    return _matcher
+
+
+def locate_on_screen(image_path: str, confidence: float = 0.8, region=None):
+    """Drop-in for pyautogui.locateCenterOnScreen backed by the shared matcher."""
+    return get_matcher().locate(image_path, confidence=confidence, region=region)
@@ -0,0 +1,169 @@
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import os
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# ========================================
+# OCR ENGINES
+# ========================================
+# pytesseract starts a tesseract process and reloads the language data on
+# every call; tesserocr keeps one API instance (and its models) in memory.
+# auto | tesserocr | pytesseract | tiled
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# processes (and horizontal bands) used by the tiled engine
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# rows shared by neighbouring bands so a word on a band edge is read whole by one of them
+TILE_OVERLAP = 40
+
+
+class OCREngine:
+    """Turns an image into word boxes: {'text', 'x', 'y', 'w', 'h', 'conf'}."""
+    name = "base"
+
+    def boxes(self, image, min_conf=50):
+        raise NotImplementedError
+
+
+class PytesseractEngine(OCREngine):
+    """One tesseract process per call (the original behaviour)."""
+    name = "pytesseract"
+
+    def __init__(self, lang=OCR_LANG):
+        if pytesseract is None:
+            raise RuntimeError("pytesseract is not installed")
+        self.lang = lang
+
+    def boxes(self, image, min_conf=50):
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        boxes = []
+        for i in range(len(data['text'])):
+            conf = int(float(data['conf'][i]))
+            text = data['text'][i].strip()
+            if conf >= min_conf and text:
+                boxes.append({
+                    'text': text,
+                    'x': data['left'][i],
+                    'y': data['top'][i],
+                    'w': data['width'][i],
+                    'h': data['height'][i],
+                    'conf': conf
+                })
+        return boxes
+
+
+class TesserocrEngine(OCREngine):
+    """A tesseract API instance kept resident for the life of the process."""
+    name = "tesserocr"
+
+    def __init__(self, lang=OCR_LANG):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self._api = tesserocr.PyTessBaseAPI(lang=lang)
+        self._lock = threading.Lock()
+
+    def boxes(self, image, min_conf=50):
+        level = tesserocr.RIL.WORD
+        boxes = []
+        with self._lock:
+            self._api.SetImage(image)
+            self._api.Recognize()
+            for word in tesserocr.iterate_level(self._api.GetIterator(), level):
+                try:
+                    text = (word.GetUTF8Text(level) or "").strip()
+                    conf = int(word.Confidence(level))
+                    x1, y1, x2, y2 = word.BoundingBox(level)
+                except RuntimeError:
+                    continue
+                if conf >= min_conf and text:
+                    boxes.append({'text': text, 'x': x1, 'y': y1, 'w': x2 - x1, 'h': y2 - y1, 'conf': conf})
+        return boxes
+
+
+def make_engine(name=None) -> OCREngine:
+    """Engine by name; 'auto' prefers tesserocr and falls back to pytesseract."""
+    name = (name or OCR_ENGINE).lower()
+    if name == "auto":
+        name = "tesserocr" if tesserocr is not None else "pytesseract"
+    if name == "tesserocr":
+        return TesserocrEngine()
+    if name == "pytesseract":
+        return PytesseractEngine()
+    if name == "tiled":
+        return TiledOCREngine()
+    raise ValueError(f"Unknown OCR engine '{name}' (choose from auto, tesserocr, pytesseract, tiled)")
+
+
+# ========================================
+# TILED FULL-SCREEN OCR
+# ========================================
+_worker_engine = None
+
+
+def _init_tile_worker(name):
+    global _worker_engine
+    _worker_engine = make_engine(name)
+
+
+def _ocr_tile(image, min_conf):
+    return _worker_engine.boxes(image, min_conf=min_conf)
+
+
+class TiledOCREngine(OCREngine):
+    """
+    Splits the image into horizontal bands and reads them in parallel, each
+    worker process holding its own resident engine.
+    """
+    name = "tiled"
+
+    def __init__(self, workers=OCR_WORKERS, inner="auto"):
+        self.workers = max(1, workers)
+        if inner == "auto":
+            inner = "tesserocr" if tesserocr is not None else "pytesseract"
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_tile_worker,
+                                         initargs=(inner,))
+
+    def boxes(self, image, min_conf=50):
+        width, height = image.size
+        band = -(-height // self.workers)
+        tiles = []
+        for top in range(0, height, band):
+            bottom = min(height, top + band)
+            crop = (0, max(0, top - TILE_OVERLAP), width, min(height, bottom + TILE_OVERLAP))
+            tiles.append((top, bottom, crop))
+
+        futures = [self._pool.submit(_ocr_tile, image.crop(crop), min_conf) for _, _, crop in tiles]
+        boxes = []
+        for (top, bottom, crop), future in zip(tiles, futures):
+            for box in future.result():
+                box['y'] += crop[1]
+                # a word in the overlap belongs to the band its center falls in
+                if top <= box['y'] + box['h'] // 2 < bottom:
+                    boxes.append(box)
+        return boxes
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """Shared engine selected by the OCR_ENGINE env var."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = make_engine()
+            print(f"[+] OCR engine: {_engine.name}")
+    return _engine
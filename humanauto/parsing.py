@@ -0,0 +1,196 @@
+from typing import Any, List, Optional, Tuple
+import json
+import re
+
+# ========================================
+# TOLERANT JSON FROM LLM REPLIES
+# ========================================
+# Chat models wrap JSON in prose and code fences, leave trailing commas,
+# use curly or single quotes and sometimes get cut off mid-array. Repair
+# what can be repaired, salvage the complete items of a truncated array,
+# and let callers validate the result against a small schema.
+
+_FENCE_RE = re.compile(r'```(?:json|JSON)?\s*(.*?)```', re.DOTALL)
+_OPEN_FENCE_RE = re.compile(r'```(?:json|JSON)?\s*(.*)$', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PY_LITERAL_RE = re.compile(r'\b(True|False|None)\b')
+# a double-quoted string literal, or the unterminated tail of one
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*(?:"|$)', re.DOTALL)
+_SINGLE_STRING_RE = re.compile(r"'((?:[^'\\\n]|\\.)*)'")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class PartialDict(dict):
+    """An object salvaged from a cut-off reply (see extract_json)."""
+    partial = True
+
+
+class PartialList(list):
+    """An array salvaged from a cut-off reply (see extract_json)."""
+    partial = True
+
+
+def _candidates(text: str) -> List[str]:
+    """Fenced blocks first (an unterminated fence counts), then the whole reply."""
+    fenced = [m.group(1) for m in _FENCE_RE.finditer(text)]
+    if not fenced:
+        match = _OPEN_FENCE_RE.search(text)
+        if match:
+            fenced = [match.group(1)]
+    return fenced + [text]
+
+
+def _outside_strings(text: str, fix) -> str:
+    """Apply fix() to everything between double-quoted string literals."""
+    parts, last = [], 0
+    for match in _STRING_RE.finditer(text):
+        parts.append(fix(text[last:match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(fix(text[last:]))
+    return "".join(parts)
+
+
+def _repair(text: str) -> str:
+    """Fix the usual LLM slips without touching the contents of string values."""
+    # curly quotes used as delimiters (the ones inside proper strings stay)
+    text = _outside_strings(text, lambda s: s.replace("“", '"').replace("”", '"'))
+    if '"' not in text:
+        # single-quoted JSON; only touched when there are no double quotes to break
+        text = text.replace("‘", "'").replace("’", "'")
+        text = _SINGLE_STRING_RE.sub(lambda m: '"' + m.group(1).replace("\\'", "'") + '"', text)
+    text = _outside_strings(text, lambda s: _PY_LITERAL_RE.sub(lambda m: _PY_LITERALS[m.group(1)], s))
+    return _outside_strings(text, lambda s: _TRAILING_COMMA_RE.sub(r'\1', s))
+
+
+def _scan(text: str) -> Tuple[Optional[int], Optional[Tuple[int, str]]]:
+    """
+    Walk text (starting at an opening bracket) and return (end, cut):
+    end is the index just past the matching close bracket, or None if the
+    text stops early; cut is the last point where an array item finished
+    along with the brackets needed to close everything still open.
+    """
+    stack, cut = [], None
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack or _CLOSERS[stack[-1]] != ch:
+                return None, cut
+            stack.pop()
+            if not stack:
+                return i + 1, cut
+            if stack[-1] == "[":
+                cut = (i + 1, "".join(_CLOSERS[c] for c in reversed(stack)))
+    return None, cut
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _parse_at(raw: str) -> Tuple[Optional[Any], int, bool]:
+    """
+    Parse the JSON value starting at raw[0].
+    Returns (data, characters consumed, salvaged from a cut-off reply).
+    """
+    # valid JSON as written first; repairs only when that fails
+    for body in (raw, _repair(raw)):
+        end, cut = _scan(body)
+        if end is not None:
+            data = _loads(body[:end])
+            if data is not None:
+                return data, end, False
+        if cut is not None:
+            data = _loads(_repair(body[:cut[0]] + cut[1]))
+            if data is not None:
+                return data, len(raw), True
+    return None, 1, False
+
+
+def extract_json(text: str, expect: type = None) -> Optional[Any]:
+    """
+    Best-effort JSON object or array from an LLM reply.
+
+    Args:
+        text (str): The raw reply.
+        expect (type): dict or list to skip JSON of the other kind (e.g. a
+            "[1]" in the prose before the object). A value of the other kind
+            is skipped whole, so expect=dict never returns an object from
+            inside an array.
+
+    Returns:
+        The parsed dict/list, or None when nothing usable was found. A reply
+        cut off inside an array yields the items that were complete, as a
+        PartialDict/PartialList (`.partial` is True) so callers can avoid
+        caching it.
+    """
+    if not text:
+        return None
+    wanted = expect or (dict, list)
+    direct = _loads(text.strip())
+    if isinstance(direct, wanted):
+        return direct
+
+    for candidate in _candidates(text):
+        position = 0
+        while True:
+            starts = [i for i in (candidate.find("{", position), candidate.find("[", position)) if i != -1]
+            if not starts:
+                break
+            start = min(starts)
+            data, consumed, salvaged = _parse_at(candidate[start:])
+            if isinstance(data, wanted):
+                if salvaged:
+                    print("[!] Reply was cut off, keeping the complete items")
+                    return PartialDict(data) if isinstance(data, dict) else PartialList(data)
+                return data
+            position = start + consumed
+    return None
+
+
+# ========================================
+# SCHEMAS
+# ========================================
+# A schema maps each required key (matched case-insensitively) to a type,
+# a tuple of types, or a predicate returning True for valid values.
+
+def schema_errors(data: Any, schema: dict) -> List[str]:
+    """What's wrong with data under schema (empty list = valid)."""
+    if not isinstance(data, dict):
+        return ["not a JSON object"]
+    lowered = {str(key).lower(): value for key, value in data.items()}
+    errors = []
+    for key, expected in schema.items():
+        value = lowered.get(key.lower())
+        if value is None:
+            errors.append(f"missing {key}")
+        elif isinstance(expected, (type, tuple)):
+            if not isinstance(value, expected):
+                errors.append(f"{key} is {type(value).__name__}")
+        elif not expected(value):
+            errors.append(f"invalid {key}: {str(value)[:40]}")
+    return errors
+
+
+def split_valid(items: list, schema: dict) -> Tuple[list, list]:
+    """(valid, invalid) items of a list under schema."""
+    valid, invalid = [], []
+    for item in items or []:
+        (invalid if schema_errors(item, schema) else valid).append(item)
+    return valid, invalid
@@ -0,0 +1,105 @@
+import threading
+import os
+import pyautogui
+from .ocr import get_ocr_engine
+
+# ========================================
+# SCREEN STATE CACHE
+# ========================================
+# OCR word boxes of the last frame, kept per horizontal band. A new frame
+# is hashed band by band and only bands whose pixels changed are read again,
+# so consecutive lookups on a still screen cost one screenshot.
+
+SCREEN_BANDS = int(os.getenv("SCREEN_BANDS", "8"))
+# rows around each band that are hashed and read with it (words on band edges)
+BAND_OVERLAP = 20
+# past this share of dirty bands one full-frame OCR is cheaper than many small ones
+FULL_OCR_RATIO = 0.6
+
+
+class ScreenState:
+    """
+    Word boxes of the screen (or a region), re-OCR'ing only the bands that
+    changed since the previous call. Boxes are cached with every confidence
+    and filtered per call, so callers with different min_conf share them.
+    """
+
+    def __init__(self, region=None, bands: int = SCREEN_BANDS):
+        self.region = region
+        self.bands = max(1, bands)
+        self.frame_hash = None
+        self._band_hashes = []
+        self._band_boxes = []
+        self._lock = threading.Lock()
+
+    def _layout(self, size):
+        width, height = size
+        step = -(-height // self.bands)
+        layout = []
+        for top in range(0, height, step):
+            bottom = min(height, top + step)
+            layout.append((top, bottom, (0, max(0, top - BAND_OVERLAP), width, min(height, bottom + BAND_OVERLAP))))
+        return layout
+
+    def _read(self, image, layout, indexes):
+        """OCR the given bands of image; returns {band index: boxes}."""
+        engine = get_ocr_engine()
+        if len(indexes) >= FULL_OCR_RATIO * len(layout):
+            result = {i: [] for i in indexes}
+            for box in engine.boxes(image, min_conf=0):
+                center = box['y'] + box['h'] // 2
+                for i in indexes:
+                    if layout[i][0] <= center < layout[i][1]:
+                        result[i].append(box)
+                        break
+            return result
+
+        result = {}
+        for i in indexes:
+            top, bottom, crop = layout[i]
+            boxes = []
+            for box in engine.boxes(image.crop(crop), min_conf=0):
+                box['y'] += crop[1]
+                if top <= box['y'] + box['h'] // 2 < bottom:
+                    boxes.append(box)
+            result[i] = boxes
+        return result
+
+    def boxes(self, min_conf=50):
+        """Word boxes on the current screen with confidence >= min_conf."""
+        with self._lock:
+            image = pyautogui.screenshot(region=self.region).convert("L")
+            frame_hash = hash(image.tobytes())
+            if frame_hash != self.frame_hash:
+                layout = self._layout(image.size)
+                band_hashes = [hash(image.crop(crop).tobytes()) for _, _, crop in layout]
+                if len(band_hashes) != len(self._band_hashes):
+                    dirty = list(range(len(layout)))
+                    self._band_boxes = [[] for _ in layout]
+                else:
+                    dirty = [i for i, h in enumerate(band_hashes) if h != self._band_hashes[i]]
+                for i, boxes in self._read(image, layout, dirty).items():
+                    self._band_boxes[i] = boxes
+                self._band_hashes = band_hashes
+                self.frame_hash = frame_hash
+
+            offset_x, offset_y = (self.region[0], self.region[1]) if self.region else (0, 0)
+            return [dict(box, x=box['x'] + offset_x, y=box['y'] + offset_y)
+                    for band in self._band_boxes for box in band if box['conf'] >= min_conf]
+
+    def invalidate(self):
+        with self._lock:
+            self.frame_hash = None
+            self._band_hashes = []
+            self._band_boxes = []
+
+
+_screen_state = None
+
+
+def get_screen_state() -> ScreenState:
+    """Shared full-screen state."""
+    global _screen_state
+    if _screen_state is None:
+        _screen_state = ScreenState()
+    return _screen_state
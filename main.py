@@ -1,108 +1,82 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-from utils import process_text_data, analyze_facebook_lead, proccess_leads
-from humanauto import say
-import html2text
-import re
+import argparse
+from utils import process_ad_batches, proccess_leads
+from utils.adlibrary import crawl_ad_library
+from utils.facebook import LEAD_BATCH_SIZE
+import humanauto
 import pandas as pd
-import json
 
-# === Browser Setup ===
-options = Options()
-options.binary_location = "/usr/bin/chromium"
-options.add_argument("--headless")          # Critical: avoids ad blocker
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-gpu")
-options.add_argument("--window-size=1932,1180")
-options.add_argument("--disable-extensions")
+# stop harvesting a query after this many unique ads
+TARGET_ADS = 300
 
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
 
-def clean_image_urls(text: str) -> str:
-    """
-    Remove image markdown syntax with Facebook CDN URLs.
-    Pattern: ![anything](https://scontent...anything)
-    """
-    # Remove lines or parts containing ![...](...) with scontent URLs
-    cleaned_text = re.sub(r'!\[.*?\]\(https://scontent[^\)]*\)', '', text)
-    return cleaned_text
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crawl the Meta Ad Library and analyze advertisers as leads.")
+    parser.add_argument("-q", "--query", action="append", default=[],
+                        help="Keyword to search (repeatable)")
+    parser.add_argument("--queries-file",
+                        help="File with one keyword per line (lines starting with # are ignored)")
+    parser.add_argument("-c", "--country", action="append", default=[],
+                        help="Country code to search in (repeatable, default BD)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="How many browsers crawl queries at once")
+    parser.add_argument("--target-ads", type=int, default=TARGET_ADS,
+                        help="Stop each query after this many unique ads")
+    parser.add_argument("--capture", action="store_true",
+                        help="Decode ads from the Ad Library GraphQL responses instead of the rendered page")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore the page cache and re-scrape every advertiser page")
+    parser.add_argument("--score-batch", type=int, default=LEAD_BATCH_SIZE,
+                        help="Score this many advertiser pages per LLM prompt (1 = one prompt per page)")
+    return parser.parse_args()
 
-try:
-    # === Build & Visit URL ===
-    query = "online store Dhaka" 
-    url = (
-        f"https://www.facebook.com/ads/library/"
-        f"?active_status=active"
-        f"&ad_type=all"
-        f"&country=BD"
-        f"&is_targeted_country=true"
-        f"&media_type=all"
-        f"&q={query}"
-        f"&search_type=keyword_unordered"
-        f"&impression_condition=HAS_IMPRESSIONS_LAST_7DAYS"
-    )
-
-    print(f"Visiting: {url}")
-    say(f"Visiting...")
-    driver.get(url)
 
-    # === Wait for ad blocker warning to disappear (if any) ===
-    try:
-        WebDriverWait(driver, 8).until_not(
-            EC.presence_of_element_located((By.XPATH, "//div[contains(text(), '关闭广告拦截工具')]"))
-        )
-        print("✅ Ad blocker warning gone.")
-    except:
-        print("⚠️ Warning: Ad blocker message may still be present.")
-        # Still proceed — maybe it didn't appear
+def load_jobs(args) -> list:
+    """Every keyword × country combination, in the order given."""
+    queries = list(args.query)
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not queries:
+        queries = ["online store Dhaka"]
+    countries = args.country or ["BD"]
 
-    # === Wait for first ad to load using your signal ===
-    print("Waiting for first ad (looking for 'Library ID: ')...")
-    WebDriverWait(driver, 25).until(
-        EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Library ID: ')]"))
-    )
-    print("✅ First ad loaded!")
+    jobs = []
+    for query in dict.fromkeys(queries):
+        for country in dict.fromkeys(countries):
+            jobs.append((query, country))
+    return jobs
 
-    # === Scroll to bottom to load more ===
-    say("Scrolling to bottom to load more ads...")
-    print("Scrolling to bottom to load more ads...")
-    # driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    # time.sleep(4)  # Wait for lazy-loaded ads
 
-    # Optional: scroll multiple times if needed
-    # for _ in range(3):
-    #     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    #     time.sleep(2)
+def main():
+    args = parse_args()
+    jobs = load_jobs(args)
+    print(f"[+] {len(jobs)} search(es) queued with concurrency {args.concurrency}")
+    humanauto.say("Visiting...")
 
-    fullText = html2text.html2text(driver.page_source)
-    fullText = clean_image_urls(fullText)
+    batches = crawl_ad_library(
+        jobs,
+        concurrency=args.concurrency,
+        target_count=args.target_ads,
+        capture=args.capture,
+    )
+    json_data = process_ad_batches(batches)
+    if not json_data:
+        print("No ads extracted.")
+        return
 
-    filename = f"meta_ads_{query.replace(' ', '_')}.txt"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(fullText)
-    
-    json_data = process_text_data(fullText, query)
     selected_fields = ['advertiser', 'advertiser_facebook_link', 'advertiser_website_link', 'contact', 'library_id']
-    
+
     # Create DataFrame and rename columns to look better
-    ads_df = pd.DataFrame(json_data)[selected_fields]
+    ads_df = pd.DataFrame(json_data).reindex(columns=selected_fields)
     ads_df.columns = ['Advertiser', 'Facebook Link', 'Website Link', 'Contact', 'Library ID']
     # Drop duplicates based on Advertiser column, keeping the first occurrence
     ads_df = ads_df.drop_duplicates(subset=['Advertiser'], keep='first')
     # Save to CSV
     ads_df.to_csv('extracted_ads.csv', index=False)
-    proccess_leads(json_data)
-    say("Successfully analyzed every facebook page and sorted according to probability and saved in Database")
+    proccess_leads(json_data, refresh=args.refresh, score_batch_size=args.score_batch)
+    humanauto.say("Successfully analyzed every facebook page and sorted according to probability and saved in Database")
     print("\n\n[+] Successfully analyzed every facebook page and sorted according to probability and saved in Database\n\n")
-finally:
-    driver.quit()
-    print("Browser closed.")
 
+
+if __name__ == "__main__":
+    main()
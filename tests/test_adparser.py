@@ -0,0 +1,101 @@
+from utils.adparser import parse_ad_card, split_ad_cards, find_graphql_ads
+
+# html2text output of two Ad Library cards, as harvested by crawl_ad_library
+CARD = """Library ID: 1234567890
+
+Started running on 12 Mar 2025 · Total active time 5 hrs
+
+[Dhaka Gadgets](https://www.facebook.com/dhakagadgets/)
+
+Sponsored
+
+Best mini fan in town! Call 01712-345-678. Inside Dhaka 60 tk, outside Dhaka 120 tk.
+
+[Shop now](https://l.facebook.com/l.php?u=https%3A%2F%2Fdhakagadgets.com%2Ffan&h=AT0)
+"""
+
+CARD_WITHOUT_PAGE = """Library ID: 2222222222
+
+Started running on 1 Apr 2025
+
+Sponsored
+
+An ad whose page link didn't make it into the text.
+"""
+
+
+# ========================================
+# html2text cards
+# ========================================
+def test_parse_ad_card_fields():
+    ad = parse_ad_card(CARD)
+    assert ad["advertiser"] == "Dhaka Gadgets"
+    assert ad["advertiser_facebook_link"] == "https://www.facebook.com/dhakagadgets/"
+    assert ad["advertiser_website_link"] == "https://dhakagadgets.com/fan"
+    assert ad["library_id"] == "1234567890"
+    assert ad["start_date"] == "2025-03-12"
+    assert ad["active_time"] == "5 hrs"
+    assert ad["content_preview"].startswith("Best mini fan in town!")
+    assert ad["contact"] == "01712-345-678"
+    assert ad["delivery_cost_inside"] == "60 tk"
+    assert ad["delivery_cost_outside"] == "120 tk"
+
+
+def test_parse_ad_card_without_page_link_is_left_for_the_llm():
+    assert parse_ad_card(CARD_WITHOUT_PAGE) is None
+    assert parse_ad_card("no marker here") is None
+
+
+def test_split_ad_cards_one_segment_per_library_id():
+    text = "Filters · Sort by\n\n" + CARD + "\n" + CARD_WITHOUT_PAGE
+    cards = split_ad_cards(text)
+    assert len(cards) == 2
+    assert cards[0].startswith("Library ID: 1234567890")
+    assert cards[1].startswith("Library ID: 2222222222")
+    assert "Filters" not in "".join(cards)
+
+
+# ========================================
+# GraphQL records
+# ========================================
+def _record(**overrides):
+    record = {
+        "ad_archive_id": "111",
+        "page_id": "999",
+        "page_name": "Gadget BD",
+        "start_date": 1741737600,  # 2025-03-12
+        "end_date": 1741996800,    # three days later
+        "snapshot": {
+            "page_profile_uri": "https://www.facebook.com/gadgetbd/",
+            "link_url": "https://gadgetbd.com/",
+            "body": {"text": "Order now: 01812345678"},
+        },
+    }
+    record.update(overrides)
+    return record
+
+
+def test_find_graphql_ads_walks_the_payload():
+    payload = {"data": {"ad_library_main": {"search_results_connection": {"edges": [
+        {"node": {"collated_results": [_record(), _record(ad_archive_id="222")]}},
+        {"node": {"ad_archive_id": "333", "snapshot": None}},  # not an ad record
+    ]}}}}
+    ads = find_graphql_ads(payload)
+    assert [ad["library_id"] for ad in ads] == ["111", "222"]
+
+    ad = ads[0]
+    assert ad["advertiser"] == "Gadget BD"
+    assert ad["advertiser_facebook_link"] == "https://www.facebook.com/gadgetbd/"
+    assert ad["advertiser_website_link"] == "https://gadgetbd.com/"
+    assert ad["start_date"] == "2025-03-12"
+    assert ad["active_time"] == "3 days"
+    assert ad["content_preview"] == "Order now: 01812345678"
+    assert ad["contact"] == "01812345678"
+
+
+def test_graphql_record_without_page_name_or_profile_uri():
+    record = _record(page_name=None, snapshot={"body": "Mini fan 450 tk"})
+    ad = find_graphql_ads([record])[0]
+    assert ad["advertiser"] == ""
+    assert ad["advertiser_facebook_link"] == "https://www.facebook.com/999/"
+    assert ad["advertiser_website_link"] is None
@@ -0,0 +1,40 @@
+import os
+
+import utils.cache as page_cache
+from utils.cache import PageCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(page_cache, "time", clock)
+    cache = PageCache(directory=str(tmp_path), ttl_hours=1)
+    cache.put("https://www.facebook.com/ShopA/?ref=ads", "page text")
+
+    clock.now += 3599
+    assert cache.get("https://facebook.com/shopa") == "page text"
+    clock.now += 2
+    assert cache.get("https://facebook.com/shopa") is None
+
+
+def test_least_recently_used_page_is_evicted(tmp_path):
+    cache = PageCache(directory=str(tmp_path), max_entries=2)
+    cache.put("https://facebook.com/a", "a")
+    cache.put("https://facebook.com/b", "b")
+    # same-second writes: age both files so the hit below is clearly newer
+    os.utime(cache._path("https://facebook.com/a"), (1000, 1000))
+    os.utime(cache._path("https://facebook.com/b"), (2000, 2000))
+
+    assert cache.get("https://facebook.com/a") == "a"  # bumps "a" past "b"
+    cache.put("https://facebook.com/c", "c")
+
+    assert cache.get("https://facebook.com/b") is None
+    assert cache.get("https://facebook.com/a") == "a"
+    assert cache.get("https://facebook.com/c") == "c"
@@ -0,0 +1,59 @@
+from utils.adparser import LIBRARY_ID_RE
+from utils.data_ai import split_on_ad_boundaries, has_ad_signal, process_large_ad_file
+from utils.llm import StubBackend
+
+
+def _card(library_id: str, page: str) -> str:
+    return (f"Library ID: {library_id}\n\nStarted running on 12 Mar 2025\n\n"
+            f"[{page}](https://www.facebook.com/{page.lower()}/)\n\nSponsored\n\n"
+            f"Mini fan for {page}, inside Dhaka 60 tk.\n")
+
+
+NAVIGATION = ("[Home](https://www.facebook.com/) [Ad Library](https://www.facebook.com/ads/library/) "
+              "[Help](https://www.facebook.com/help/)")
+FOOTER = "About · Privacy · Terms · Cookies · Meta © 2025"
+
+
+# ========================================
+# split_on_ad_boundaries
+# ========================================
+def test_chunks_keep_whole_ads_with_no_overlap():
+    ids = [str(1000000000 + i) for i in range(12)]
+    text = "".join(_card(library_id, f"Page{i}") for i, library_id in enumerate(ids))
+    chunks = split_on_ad_boundaries(text, max_tokens=120)
+
+    assert len(chunks) > 1
+    # every ad lands in exactly one chunk
+    assert sorted(i for chunk in chunks for i in LIBRARY_ID_RE.findall(chunk)) == ids
+    for chunk in chunks:
+        cards = chunk.count("Library ID:")
+        assert chunk.count("Sponsored") == cards and chunk.count("inside Dhaka") == cards
+
+
+def test_oversized_ad_is_split_on_lines_without_overlap():
+    card = "".join(f"line {i:02d} of a very long ad\n" for i in range(12))
+    chunks = split_on_ad_boundaries(card, max_tokens=20)
+    assert len(chunks) > 1
+    assert "".join(chunks) == card
+
+
+# ========================================
+# has_ad_signal
+# ========================================
+def test_has_ad_signal():
+    assert has_ad_signal(_card("1234567890", "Shop"))
+    assert has_ad_signal("Sponsored\n\n[Fan House](https://www.facebook.com/fanhouse/)\n\nMini fan 500 tk")
+    assert not has_ad_signal(NAVIGATION)
+    assert not has_ad_signal(FOOTER)
+
+
+def test_chunks_without_ads_never_reach_the_llm(monkeypatch):
+    monkeypatch.setattr("utils.llm_cache.LLM_CACHE_ENABLED", False)
+    backend = StubBackend()
+    ads = process_large_ad_file(NAVIGATION + "\n\n" + FOOTER, output_file=None, backend=backend)
+    assert ads == []
+    assert backend.calls == []
+
+    process_large_ad_file(NAVIGATION + "\n\nSponsored\n\n[Fan House](https://www.facebook.com/fanhouse/) "
+                          "Mini fan 500 tk\n\n" + FOOTER, output_file=None, backend=backend)
+    assert len(backend.calls) == 1
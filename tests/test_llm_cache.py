@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import utils.llm_cache as llm_cache
+from utils.llm_cache import LLMCache, cached_llm_call
+from humanauto.parsing import extract_json
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def _cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return LLMCache(path=str(tmp_path / "llm.sqlite"), **kwargs), clock
+
+
+# ========================================
+# LLMCache eviction
+# ========================================
+def test_evict_by_age(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, max_age_days=1)
+    cache.put("old", {"ads": [1]})
+    clock.now += 86400 / 2
+    cache.put("new", {"ads": [2]})
+
+    clock.now += 86400 * 3 / 4  # "old" is now past a day, "new" isn't
+    cache.evict()
+    assert cache.stats()["entries"] == 1
+    assert cache.get("old") is None
+    assert cache.get("new") == {"ads": [2]}
+
+
+def test_evict_by_count_drops_least_recently_used(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, max_entries=2)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(key, {"key": key})
+    clock.now += 1
+    cache.get("a")  # "b" is now the least recently used
+
+    cache.evict()
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == {"key": "a"} and cache.get("c") == {"key": "c"}
+
+
+# ========================================
+# cached_llm_call
+# ========================================
+def test_only_complete_replies_are_cached(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    monkeypatch.setattr(llm_cache, "get_llm_cache", lambda: cache)
+    backend = SimpleNamespace(cache_identity="stub")
+    truncated = extract_json('{"ads": [{"advertiser": "A"}, {"adver')
+
+    for prompt, reply in (("failed", {}), ("truncated", truncated), ("good", {"ads": []})):
+        assert cached_llm_call(backend, "v1", prompt, lambda p: reply) == reply
+
+    assert cache.stats()["entries"] == 1
+    assert cache.get(cache.make_key("stub", "v1", "good")) == {"ads": []}
@@ -0,0 +1,98 @@
+from humanauto.parsing import extract_json, schema_errors, split_valid
+
+
+# ========================================
+# extract_json
+# ========================================
+def test_plain_object():
+    assert extract_json('{"a": 1}') == {"a": 1}
+
+
+def test_fenced_object_after_prose():
+    reply = 'Looks like a good lead.\n```json\n{"Probability": 78, "Service": "x"}\n```\nThanks'
+    assert extract_json(reply) == {"Probability": 78, "Service": "x"}
+
+
+def test_trailing_comma():
+    reply = '```json\n{\n  "Probability": "78",\n  "Reasoning": "y",\n}\n```'
+    assert extract_json(reply) == {"Probability": "78", "Reasoning": "y"}
+
+
+def test_curly_quotes_inside_a_valid_string_are_kept():
+    reply = 'Here you go:\n```json\n{"Reasoning": "sells “premium” goods"}\n```'
+    assert extract_json(reply) == {"Reasoning": "sells “premium” goods"}
+
+
+def test_curly_quotes_as_delimiters_are_repaired():
+    assert extract_json('{“a”: “b”}') == {"a": "b"}
+
+
+def test_python_literals_outside_strings_only():
+    assert extract_json('{"a": "a, True story", "b": True, "c": None,}') == {
+        "a": "a, True story", "b": True, "c": None,
+    }
+
+
+def test_single_quoted_json():
+    assert extract_json("{'a': 'b', 'c': False}") == {"a": "b", "c": False}
+
+
+def test_truncated_array_keeps_complete_items():
+    reply = '```json\n[{"id": "x"}, {"id": "y"}, {"id'
+    assert extract_json(reply) == [{"id": "x"}, {"id": "y"}]
+
+
+def test_truncated_object_keeps_complete_array_items():
+    reply = '{"ads": [{"a": 1}, {"a": 2}, {"a": "tru'
+    assert extract_json(reply) == {"ads": [{"a": 1}, {"a": 2}]}
+
+
+def test_salvaged_reply_is_marked_partial():
+    data = extract_json('{"ads": [{"advertiser": "A"}, {"advertiser": "B"}, {"adver')
+    assert data == {"ads": [{"advertiser": "A"}, {"advertiser": "B"}]}
+    assert getattr(data, "partial", False)
+    assert not getattr(extract_json('{"ads": []}'), "partial", False)
+
+
+def test_expect_skips_json_of_the_other_kind():
+    reply = 'see [1] below {"ads": []}'
+    assert extract_json(reply, expect=dict) == {"ads": []}
+    assert extract_json(reply) == [1]
+
+
+def test_expect_list_returns_the_whole_array():
+    reply = '```json\n[{"id": "a", "Probability": 10}, {"id": "b", "Probability": 20}]\n```'
+    assert extract_json(reply, expect=list) == [{"id": "a", "Probability": 10}, {"id": "b", "Probability": 20}]
+    assert extract_json(reply, expect=dict) is None
+
+
+def test_nothing_usable():
+    assert extract_json("") is None
+    assert extract_json("no json here") is None
+
+
+# ========================================
+# schema_errors / split_valid
+# ========================================
+SCHEMA = {"Probability": lambda v: str(v).isdigit(), "Service": str}
+
+
+def test_schema_valid_and_case_insensitive():
+    assert schema_errors({"probability": "78", "service": "x"}, SCHEMA) == []
+
+
+def test_schema_reports_missing_and_wrong_type():
+    errors = schema_errors({"Probability": "high", "Service": 3}, SCHEMA)
+    assert errors == ["invalid Probability: high", "Service is int"]
+    assert schema_errors({}, SCHEMA) == ["missing Probability", "missing Service"]
+
+
+def test_schema_rejects_non_objects():
+    assert schema_errors([1, 2], SCHEMA) == ["not a JSON object"]
+
+
+def test_split_valid():
+    good = {"Probability": 5, "Service": "x"}
+    bad = {"Service": "x"}
+    assert split_valid([good, bad, "junk"], SCHEMA) == ([good], [bad, "junk"])
+    assert split_valid(None, SCHEMA) == ([], [])
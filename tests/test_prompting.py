@@ -0,0 +1,43 @@
+from utils.llm import estimate_tokens
+from utils.prompting import build_lead_context
+
+LONG_PAGE = " ".join(f"word{i}" for i in range(2000))
+SHORT_PAGE = "Handmade leather shoes, delivery all over Bangladesh."
+LONG_RESEARCH = [f"Result {i}: a review of the shop's leather shoes and delivery times " + "x" * 200
+                 for i in range(10)]
+SHORT_RESEARCH = ["The shop is listed on a local marketplace with good ratings for its shoes."]
+
+
+def _total(usage: dict) -> int:
+    return usage["page_tokens"] + usage["research_tokens"]
+
+
+def test_short_page_leaves_its_budget_to_research():
+    context, usage = build_lead_context(SHORT_PAGE, LONG_RESEARCH, budget=200, research_share=0.3)
+    assert usage["page_tokens"] == estimate_tokens(SHORT_PAGE)
+    assert usage["research_tokens"] > 200 * 0.3
+    assert _total(usage) <= 200
+    assert usage["page_dropped_tokens"] == 0
+    assert "External Research" in context
+
+
+def test_short_research_leaves_its_budget_to_the_page():
+    context, usage = build_lead_context(LONG_PAGE, SHORT_RESEARCH, budget=200, research_share=0.3)
+    assert usage["research_tokens"] == estimate_tokens(f"- {SHORT_RESEARCH[0]}")
+    assert usage["page_tokens"] > 200 * 0.7
+    assert _total(usage) <= 200
+    assert usage["page_dropped_tokens"] > 0
+
+
+def test_long_page_and_research_split_by_share():
+    _, usage = build_lead_context(LONG_PAGE, LONG_RESEARCH, budget=200, research_share=0.3)
+    assert usage["research_tokens"] <= 200 * 0.3
+    assert _total(usage) <= 200
+
+
+def test_no_research_gives_the_page_everything():
+    context, usage = build_lead_context(LONG_PAGE, [], budget=200, heading="####")
+    assert usage["research_tokens"] == 0
+    assert usage["page_tokens"] > 190
+    assert context.startswith("#### Facebook Page Content")
+    assert "External Research" not in context
@@ -1,3 +1,20 @@
-from .data_ai import process_text_data
-from .facebook import getPageData, analyze_facebook_lead
-from .sort import proccess_leads
\ No newline at end of file
+import importlib
+
+# Resolved on first use, so the pure helpers (adparser, cache, llm_cache)
+# import without the scraping and LLM dependencies.
+_EXPORTS = {
+    ".data_ai": ["process_text_data", "process_ad_batches"],
+    ".facebook": ["getPageData", "analyze_facebook_lead"],
+    ".sort": ["proccess_leads"],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module 'utils' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
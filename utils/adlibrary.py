@@ -0,0 +1,362 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from urllib.parse import quote_plus
+from functools import partial
+import threading
+import html2text
+import queue
+import json
+import time
+import re
+from .browser import BrowserSession, build_chrome_options
+from .adparser import find_graphql_ads, LIBRARY_ID_RE
+
+# Marks every "Library ID:" node we've already handed downstream, so each
+# scroll only returns the cards that were rendered since the last one. The
+# mark goes on the node itself, not the card: a card alone in its group
+# would otherwise mark the whole group and hide cards rendered into it later.
+_NEW_CARDS_JS = """
+const out = [];
+const hits = document.evaluate("//*[contains(text(), 'Library ID:')]", document, null,
+                               XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < hits.snapshotLength; i++) {
+    const node = hits.snapshotItem(i);
+    if (node.hasAttribute('data-ch-seen')) continue;
+    node.setAttribute('data-ch-seen', '1');
+    // climb to the widest ancestor that still holds exactly one ad (for its HTML only)
+    let card = node;
+    while (card.parentElement && card.parentElement !== document.body &&
+           (card.parentElement.textContent.match(/Library ID:/g) || []).length <= 1) {
+        card = card.parentElement;
+    }
+    out.push(card.outerHTML);
+}
+return out;
+"""
+
+
+def clean_image_urls(text: str) -> str:
+    """
+    Remove image markdown syntax with Facebook CDN URLs.
+    Pattern: ![anything](https://scontent...anything)
+    """
+    # Remove lines or parts containing ![...](...) with scontent URLs
+    cleaned_text = re.sub(r'!\[.*?\]\(https://scontent[^\)]*\)', '', text)
+    return cleaned_text
+
+
+def card_html_to_text(card_html: str) -> str:
+    return clean_image_urls(html2text.html2text(card_html)).strip()
+
+
+def harvest_ad_cards(driver, target_count=300, batch_size=25, max_idle_rounds=4, scroll_pause=1.5):
+    """
+    Keep scrolling the Ad Library results and stream newly rendered ad cards.
+
+    Args:
+        driver: Selenium driver already showing Ad Library results.
+        target_count (int): Stop after this many unique ads.
+        batch_size (int): Yield once this many new cards are pending.
+        max_idle_rounds (int): Stop after this many scrolls with no new cards and no page growth.
+        scroll_pause (float): Seconds to let lazy-loaded cards render after each scroll.
+
+    Yields:
+        list[str]: Text of the new cards (html2text, images stripped), in page order.
+    """
+    seen_ids = set()
+    pending = []
+    total = 0
+    idle_rounds = 0
+    last_height = 0
+
+    while total < target_count and idle_rounds < max_idle_rounds:
+        new_cards = driver.execute_script(_NEW_CARDS_JS) or []
+
+        fresh = 0
+        for card_html in new_cards:
+            card_text = card_html_to_text(card_html)
+            match = LIBRARY_ID_RE.search(card_text)
+            # Virtualized lists can re-render cards we already sent
+            if match and match.group(1) in seen_ids:
+                continue
+            if match:
+                seen_ids.add(match.group(1))
+            pending.append(card_text)
+            fresh += 1
+            total += 1
+            if total >= target_count:
+                break
+
+        if len(pending) >= batch_size or (pending and total >= target_count):
+            print(f"[+] Streaming {len(pending)} new ads ({total} so far)")
+            yield pending
+            pending = []
+
+        if total >= target_count:
+            break
+
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(scroll_pause)
+        height = driver.execute_script("return document.body.scrollHeight;")
+
+        if fresh == 0 and height == last_height:
+            idle_rounds += 1
+        else:
+            idle_rounds = 0
+        last_height = height
+
+    if pending:
+        print(f"[+] Streaming {len(pending)} new ads ({total} so far)")
+        yield pending
+
+    print(f"[+] Harvest finished: {total} ads")
+
+
+# ========================================
+# GRAPHQL CAPTURE
+# ========================================
+# Inline result blobs the server renders into the first page
+_INLINE_ADS_JS = """
+return Array.from(document.querySelectorAll('script[type="application/json"]'))
+    .map(s => s.textContent)
+    .filter(t => t.indexOf('ad_archive_id') !== -1);
+"""
+
+
+def _decode_json_documents(body: str) -> list:
+    """GraphQL responses may be 'for (;;);'-prefixed and/or several JSON docs, one per line."""
+    body = body.strip()
+    if body.startswith("for (;;);"):
+        body = body[len("for (;;);"):]
+    docs = []
+    for line in body.splitlines() or [body]:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            docs.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    if not docs:
+        try:
+            docs.append(json.loads(body))
+        except json.JSONDecodeError:
+            pass
+    return docs
+
+
+class GraphQLCapture:
+    """
+    Reads Ad Library GraphQL responses out of Chrome's performance log.
+
+    Needs a driver started with ad_library_options(capture=True). Bodies are
+    fetched with CDP Network.getResponseBody once the response has finished
+    loading, and decoded straight into our ad dict schema.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._pending = set()
+        self._finished = set()
+
+    def _drain_log(self):
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                if "/api/graphql" in params.get("response", {}).get("url", ""):
+                    self._pending.add(params["requestId"])
+            elif method == "Network.loadingFinished":
+                self._finished.add(params.get("requestId"))
+
+    def collect(self) -> list:
+        """Ads from every GraphQL response that finished since the last call."""
+        self._drain_log()
+        ads = []
+        for request_id in list(self._pending & self._finished):
+            self._pending.discard(request_id)
+            self._finished.discard(request_id)
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception:
+                continue
+            for doc in _decode_json_documents(body.get("body", "")):
+                ads.extend(find_graphql_ads(doc))
+        # don't let unrelated finished requests pile up
+        self._finished.clear()
+        return ads
+
+    def collect_inline(self) -> list:
+        ads = []
+        for blob in self.driver.execute_script(_INLINE_ADS_JS) or []:
+            for doc in _decode_json_documents(blob):
+                ads.extend(find_graphql_ads(doc))
+        return ads
+
+
+def harvest_graphql_ads(driver, target_count=300, batch_size=25, max_idle_rounds=4, scroll_pause=1.5):
+    """
+    Same scrolling loop as harvest_ad_cards, but yields ad dicts decoded from
+    the network responses — no html2text, no LLM.
+    """
+    capture = GraphQLCapture(driver)
+    seen_ids = set()
+    pending = []
+    total = 0
+    idle_rounds = 0
+    last_height = 0
+    first_round = True
+
+    while total < target_count and idle_rounds < max_idle_rounds:
+        ads = capture.collect()
+        if first_round:
+            ads = capture.collect_inline() + ads
+            first_round = False
+
+        fresh = 0
+        for ad in ads:
+            if ad["library_id"] in seen_ids:
+                continue
+            seen_ids.add(ad["library_id"])
+            pending.append(ad)
+            fresh += 1
+            total += 1
+            if total >= target_count:
+                break
+
+        if len(pending) >= batch_size or (pending and total >= target_count):
+            print(f"[+] Streaming {len(pending)} captured ads ({total} so far)")
+            yield pending
+            pending = []
+
+        if total >= target_count:
+            break
+
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(scroll_pause)
+        height = driver.execute_script("return document.body.scrollHeight;")
+
+        if fresh == 0 and height == last_height:
+            idle_rounds += 1
+        else:
+            idle_rounds = 0
+        last_height = height
+
+    if pending:
+        print(f"[+] Streaming {len(pending)} captured ads ({total} so far)")
+        yield pending
+
+    print(f"[+] Capture finished: {total} ads")
+
+
+# ========================================
+# AD LIBRARY SEARCH
+# ========================================
+def ad_library_options(capture=False):
+    options = build_chrome_options(
+        window_size="1932,1180",
+        user_agent=None,
+        binary_location="/usr/bin/chromium",
+        extra_args=["--disable-extensions"],
+    )
+    if capture:
+        # network events land in driver.get_log("performance")
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def build_ad_library_url(query: str, country: str = "BD") -> str:
+    return (
+        f"https://www.facebook.com/ads/library/"
+        f"?active_status=active"
+        f"&ad_type=all"
+        f"&country={country}"
+        f"&is_targeted_country=true"
+        f"&media_type=all"
+        f"&q={quote_plus(query)}"
+        f"&search_type=keyword_unordered"
+        f"&impression_condition=HAS_IMPRESSIONS_LAST_7DAYS"
+    )
+
+
+def open_ad_library(session: BrowserSession, query: str, country: str = "BD"):
+    """Load the results for one query and wait for the first ad. Returns the driver."""
+    url = build_ad_library_url(query, country)
+    print(f"Visiting: {url}")
+    driver = session.get(url)
+
+    # === Wait for ad blocker warning to disappear (if any) ===
+    try:
+        WebDriverWait(driver, 8).until_not(
+            EC.presence_of_element_located((By.XPATH, "//div[contains(text(), '关闭广告拦截工具')]"))
+        )
+        print("✅ Ad blocker warning gone.")
+    except:
+        print("⚠️ Warning: Ad blocker message may still be present.")
+        # Still proceed — maybe it didn't appear
+
+    # === Wait for first ad to load using your signal ===
+    print(f"Waiting for first ad for '{query}' ({country})...")
+    WebDriverWait(driver, 25).until(
+        EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Library ID: ')]"))
+    )
+    print("✅ First ad loaded!")
+    return driver
+
+
+def crawl_ad_library(jobs, concurrency=1, target_count=300, driver_path=None, capture=False):
+    """
+    Harvest several (query, country) searches through a shared work queue.
+
+    `concurrency` browsers are started once and reused for every job they pick
+    up. A job that fails is reported and skipped without stopping the others.
+    With `capture=True` ads are decoded from the GraphQL responses instead of
+    the rendered cards.
+
+    Yields:
+        (query, country, items): one batch at a time — ad card texts, or
+        ready-made ad dicts in capture mode.
+    """
+    jobs_queue = queue.Queue()
+    for job in jobs:
+        jobs_queue.put(job)
+    batches = queue.Queue()
+    done = object()
+    workers = max(1, min(int(concurrency), jobs_queue.qsize() or 1))
+
+    def worker():
+        session = BrowserSession(options_factory=partial(ad_library_options, capture=capture), driver_path=driver_path)
+        try:
+            while True:
+                try:
+                    query, country = jobs_queue.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    driver = open_ad_library(session, query, country)
+                    harvest = harvest_graphql_ads if capture else harvest_ad_cards
+                    for items in harvest(driver, target_count=target_count):
+                        batches.put((query, country, items))
+                except Exception as e:
+                    print(f"[!] Crawl failed for '{query}' ({country}): {e}")
+                    session.reset()
+        finally:
+            session.close()
+            batches.put(done)
+
+    threads = [threading.Thread(target=worker, name=f"crawler-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    finished = 0
+    while finished < workers:
+        item = batches.get()
+        if item is done:
+            finished += 1
+            continue
+        yield item
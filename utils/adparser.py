@@ -0,0 +1,242 @@
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+import re
+
+# ========================================
+# RULE-BASED AD LIBRARY CARD PARSER
+# ========================================
+# Works on the html2text output of Ad Library results (full page or harvested
+# cards). Every ad card carries a "Library ID: <digits>" line, so that's the anchor.
+
+LIBRARY_ID_RE = re.compile(r'Library ID:\s*(\d+)')
+START_DATE_RE = re.compile(r'Started running on\s+([A-Za-z0-9, ]+?\d{4})')
+ACTIVE_TIME_RE = re.compile(r'Total active time\s+([^\n·]+)')
+# html2text wraps long URLs across lines, so allow whitespace inside the (...)
+MD_LINK_RE = re.compile(r'(?<!!)\[([^\]]*)\]\((https?://[^)]+)\)')
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+BD_PHONE_RE = re.compile(r'(?:\+?880[-\s]?|\b0)1[3-9]\d{2}[-\s]?\d{3}[-\s]?\d{3}\b')
+INTL_PHONE_RE = re.compile(r'\+\d{1,3}[\s-]?\d{2,4}[\s-]?\d{3,4}[\s-]?\d{3,4}')
+DELIVERY_INSIDE_RE = re.compile(
+    r'(?:inside dhaka|ঢাকার ভিতরে|ঢাকার মধ্যে)[^\n]{0,40}?(\d+\s*(?:tk|taka|টাকা|৳))', re.IGNORECASE
+)
+DELIVERY_OUTSIDE_RE = re.compile(
+    r'(?:outside dhaka|ঢাকার বাইরে)[^\n]{0,40}?(\d+\s*(?:tk|taka|টাকা|৳))', re.IGNORECASE
+)
+FB_HOSTS = ("facebook.com", "www.facebook.com", "web.facebook.com", "m.facebook.com")
+
+
+def split_ad_cards(text: str) -> List[str]:
+    """Cut the text into one segment per "Library ID:" marker."""
+    starts = [m.start() for m in LIBRARY_ID_RE.finditer(text)]
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+def _links(card: str) -> List[Tuple[str, str]]:
+    return [(name.strip(), re.sub(r'\s+', '', url)) for name, url in MD_LINK_RE.findall(card)]
+
+
+def _unwrap_redirect(url: str) -> str:
+    """l.facebook.com/l.php?u=<real url> → <real url>"""
+    parsed = urlparse(url)
+    if parsed.netloc.endswith("l.facebook.com") and parsed.path.startswith("/l.php"):
+        target = parse_qs(parsed.query).get("u")
+        if target:
+            return unquote(target[0])
+    return url
+
+
+def is_page_link(url: str) -> bool:
+    parsed = urlparse(url)
+    if parsed.netloc not in FB_HOSTS:
+        return False
+    path = parsed.path.strip("/")
+    return bool(path) and not path.startswith(("ads/", "l.php", "policies", "privacy", "help"))
+
+
+def _parse_date(raw: str) -> Optional[str]:
+    raw = raw.strip()
+    for fmt in ("%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y"):
+        try:
+            return datetime.strptime(raw, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _plain_text(markdown: str) -> str:
+    text = MD_LINK_RE.sub(lambda m: m.group(1), markdown)
+    text = re.sub(r'!\[[^\]]*\]\([^)]*\)', '', text)
+    text = text.replace("**", "").replace("__", "").replace("\u200b", "")
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _find_contact(body: str) -> Optional[str]:
+    # phone first: the pitch builder turns it into a WhatsApp link
+    for pattern in (BD_PHONE_RE, INTL_PHONE_RE, EMAIL_RE):
+        match = pattern.search(body)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+def parse_ad_card(card: str) -> Optional[Dict]:
+    """
+    Parse one card segment into our ad dict.
+    Returns None if the advertiser page link can't be found (caller falls back to the LLM).
+    """
+    id_match = LIBRARY_ID_RE.search(card)
+    if not id_match:
+        return None
+
+    links = _links(card)
+    advertiser, page_link = None, None
+    for name, url in links:
+        if name and is_page_link(url):
+            advertiser, page_link = name, url
+            break
+    if not page_link:
+        return None
+
+    website = None
+    for _, url in links:
+        url = _unwrap_redirect(url)
+        if urlparse(url).netloc and not urlparse(url).netloc.endswith(("facebook.com", "fbcdn.net", "metastatus.com")):
+            website = url
+            break
+
+    # Ad body = everything after the "Sponsored" label (or after the page link)
+    body_start = card.find("Sponsored")
+    if body_start == -1:
+        body_start = card.find(page_link)
+    body = card[body_start:] if body_start != -1 else card
+    body = re.sub(r'^Sponsored[\s*]*', '', body)
+    preview = _plain_text(body)[:200] or None
+
+    start_match = START_DATE_RE.search(card)
+    active_match = ACTIVE_TIME_RE.search(card)
+    inside = DELIVERY_INSIDE_RE.search(body)
+    outside = DELIVERY_OUTSIDE_RE.search(body)
+
+    return {
+        "advertiser": advertiser,
+        "advertiser_facebook_link": page_link,
+        "advertiser_website_link": website,
+        "library_id": id_match.group(1),
+        "start_date": _parse_date(start_match.group(1)) if start_match else None,
+        "active_time": active_match.group(1).strip() if active_match else None,
+        "content_preview": preview,
+        "contact": _find_contact(body),
+        "delivery_cost_inside": inside.group(1) if inside else None,
+        "delivery_cost_outside": outside.group(1) if outside else None,
+    }
+
+
+def parse_ad_cards(text: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse every ad card in `text`.
+    Returns (ads, unparsed_cards) — unparsed cards are meant for the LLM fallback.
+    """
+    ads, unparsed = [], []
+    for card in split_ad_cards(text):
+        ad = parse_ad_card(card)
+        if ad:
+            ads.append(ad)
+        else:
+            unparsed.append(card)
+    return ads, unparsed
+
+
+# ========================================
+# AD LIBRARY GRAPHQL RECORDS
+# ========================================
+def _epoch_to_date(value) -> Optional[datetime]:
+    try:
+        return datetime.utcfromtimestamp(int(value))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def _active_time(start: Optional[datetime], end: Optional[datetime]) -> Optional[str]:
+    if not start:
+        return None
+    end = min(end or datetime.utcnow(), datetime.utcnow())
+    hours = max(0, int((end - start).total_seconds() // 3600))
+    return f"{hours} hrs" if hours < 48 else f"{hours // 24} days"
+
+
+def _body_text(snapshot: Dict) -> str:
+    body = snapshot.get("body") or ""
+    if isinstance(body, dict):
+        body = body.get("text") or (body.get("markup") or {}).get("__html") or ""
+    if not body:
+        # carousel ads keep their text on the cards
+        for card in snapshot.get("cards") or []:
+            body = card.get("body") or ""
+            if body:
+                break
+    return re.sub(r'<[^>]+>', ' ', str(body))
+
+
+def ad_from_graphql_record(record: Dict) -> Optional[Dict]:
+    """
+    Map one Ad Library search result (the objects carrying "ad_archive_id")
+    onto our ad dict schema.
+    """
+    library_id = record.get("ad_archive_id")
+    if not library_id:
+        return None
+    snapshot = record.get("snapshot") or {}
+
+    page_link = snapshot.get("page_profile_uri")
+    if not page_link and record.get("page_id"):
+        page_link = f"https://www.facebook.com/{record['page_id']}/"
+
+    website = None
+    for url in [snapshot.get("link_url")] + [c.get("link_url") for c in snapshot.get("cards") or []]:
+        if not url:
+            continue
+        url = _unwrap_redirect(url)
+        if not urlparse(url).netloc.endswith(("facebook.com", "fb.me", "m.me", "wa.me")):
+            website = url
+            break
+
+    body = re.sub(r'\s+', ' ', _body_text(snapshot)).strip()
+    start = _epoch_to_date(record.get("start_date"))
+    end = _epoch_to_date(record.get("end_date"))
+    inside = DELIVERY_INSIDE_RE.search(body)
+    outside = DELIVERY_OUTSIDE_RE.search(body)
+
+    return {
+        "advertiser": record.get("page_name") or snapshot.get("page_name") or "",
+        "advertiser_facebook_link": page_link,
+        "advertiser_website_link": website,
+        "library_id": str(library_id),
+        "start_date": start.strftime("%Y-%m-%d") if start else None,
+        "active_time": _active_time(start, end),
+        "content_preview": body[:200] or None,
+        "contact": _find_contact(body),
+        "delivery_cost_inside": inside.group(1) if inside else None,
+        "delivery_cost_outside": outside.group(1) if outside else None,
+    }
+
+
+def find_graphql_ads(payload) -> List[Dict]:
+    """Walk any decoded JSON payload and convert every ad record found in it."""
+    ads = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "ad_archive_id" in node and isinstance(node.get("snapshot"), dict):
+                ad = ad_from_graphql_record(node)
+                if ad:
+                    ads.append(ad)
+                return
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(payload)
+    return ads
@@ -0,0 +1,312 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import atexit
+import shutil
+import queue
+import json
+import time
+import os
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+)
+
+# recycle the browser after this many pages to keep memory in check
+MAX_PAGES_PER_BROWSER = int(os.getenv("BROWSER_MAX_PAGES", "40"))
+# how many Chrome instances scrape advertiser pages at once
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "3"))
+
+# ========================================
+# CHROMEDRIVER RESOLUTION (once, cached on disk)
+# ========================================
+DRIVER_CACHE_FILE = os.getenv("CHROMEDRIVER_CACHE", os.path.join(".cache", "chromedriver.json"))
+# re-check for a newer driver after this many days even if the cached one still works
+DRIVER_CACHE_MAX_AGE_DAYS = float(os.getenv("CHROMEDRIVER_CACHE_MAX_AGE_DAYS", "7"))
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _read_cached_driver_path():
+    try:
+        with open(DRIVER_CACHE_FILE, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = entry.get("path")
+    fresh = time.time() - entry.get("resolved_at", 0) < DRIVER_CACHE_MAX_AGE_DAYS * 86400
+    if path and fresh and os.access(path, os.X_OK):
+        return path
+    return None
+
+
+def _write_cached_driver_path(path: str):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_CACHE_FILE) or ".", exist_ok=True)
+        with open(DRIVER_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"path": path, "resolved_at": time.time()}, f)
+    except OSError as e:
+        print(f"[-] Could not cache chromedriver path: {e}")
+
+
+def resolve_driver_path(force: bool = False):
+    """
+    Find chromedriver once per process and remember it on disk.
+
+    Order: CHROMEDRIVER_PATH env → on-disk cache → ChromeDriverManager (network)
+    → chromedriver on PATH. Returns None to let Selenium decide if nothing is found.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path and not force:
+            return _driver_path
+
+        path = os.getenv("CHROMEDRIVER_PATH") or (None if force else _read_cached_driver_path())
+        if not path:
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                path = ChromeDriverManager().install()
+            except Exception as e:
+                print(f"[-] ChromeDriverManager failed ({e}), falling back to PATH")
+                path = shutil.which("chromedriver")
+            if path:
+                _write_cached_driver_path(path)
+
+        _driver_path = path
+        return path
+
+
+# ========================================
+# RESOURCE BLOCKING
+# ========================================
+# We only read text, so anything that isn't HTML/JS/XHR is wasted bandwidth.
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "1") not in ("0", "false", "False", "")
+BLOCKED_URL_PATTERNS = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.ico*", "*.svg*", "*scontent*.fbcdn.net*"],
+    "media": ["*.mp4*", "*.webm*", "*.m4a*", "*.mp3*", "*.m3u8*", "*video*.fbcdn.net*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "tracker": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        # only the pixel endpoint: "*facebook.com/tr*" would also block pages like facebook.com/trendyshopbd
+        "*connect.facebook.net*", "*facebook.com/tr/*", "*facebook.com/tr?*", "*pixel.facebook.com*",
+    ],
+}
+# comma separated categories ("image") or exact patterns ("*.svg*") that must never be blocked
+RESOURCE_ALLOWLIST = [x.strip() for x in os.getenv("RESOURCE_ALLOWLIST", "").split(",") if x.strip()]
+
+
+def blocked_url_patterns(allowlist=None) -> list:
+    """Every blocked pattern minus the allowlisted categories/patterns."""
+    allowlist = RESOURCE_ALLOWLIST if allowlist is None else allowlist
+    patterns = []
+    for category, category_patterns in BLOCKED_URL_PATTERNS.items():
+        if category in allowlist:
+            continue
+        patterns += [p for p in category_patterns if p not in allowlist]
+    return patterns
+
+
+def apply_resource_blocking(driver, allowlist=None):
+    """Tell Chrome (via CDP) to drop requests for images, media, fonts and trackers."""
+    patterns = blocked_url_patterns(allowlist)
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        print(f"[-] Could not enable resource blocking: {e}")
+
+
+def build_chrome_options(window_size="1920,1080", user_agent=DEFAULT_USER_AGENT, binary_location=None, extra_args=(),
+                         block_resources=BLOCK_RESOURCES, allowlist=None):
+    """
+    Build the headless Chrome options shared by every scraper.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"--window-size={window_size}")
+    if user_agent:
+        chrome_options.add_argument(f"user-agent={user_agent}")
+    for arg in extra_args:
+        chrome_options.add_argument(arg)
+    if block_resources:
+        allowlist = RESOURCE_ALLOWLIST if allowlist is None else allowlist
+        # images are also cut at the content-settings level (covers extensionless CDN URLs)
+        if "image" not in allowlist:
+            chrome_options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    # Optional: if using Chromium on Debian
+    if binary_location:
+        chrome_options.binary_location = binary_location
+    return chrome_options
+
+
+# ========================================
+# LONG-LIVED BROWSER SESSION
+# ========================================
+class BrowserSession:
+    """
+    Keeps one headless Chrome alive and navigates it between pages.
+
+    The driver is started lazily on first use and recycled (quit + relaunch)
+    after `max_pages` navigations or whenever a navigation crashes, so a long
+    run never pays Chrome cold-start per page.
+    """
+
+    def __init__(self, max_pages: int = MAX_PAGES_PER_BROWSER, options_factory=build_chrome_options, driver_path=None,
+                 block_resources=BLOCK_RESOURCES, allowlist=None):
+        self.max_pages = max_pages
+        self.options_factory = options_factory
+        # None = use the shared, cached resolve_driver_path()
+        self.driver_path = driver_path
+        self.block_resources = block_resources
+        self.allowlist = allowlist
+        self.pages_served = 0
+        self._driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            print("[+] Starting browser session...")
+            try:
+                self._driver = self._start()
+            except Exception as e:
+                if self.driver_path:
+                    raise
+                # cached driver may no longer match the installed Chrome; resolve again
+                print(f"[-] Browser failed to start ({e}), re-resolving chromedriver...")
+                resolve_driver_path(force=True)
+                self._driver = self._start()
+            if self.block_resources:
+                apply_resource_blocking(self._driver, self.allowlist)
+            self.pages_served = 0
+        return self._driver
+
+    def _start(self):
+        path = self.driver_path or resolve_driver_path()
+        service = Service(path) if path else None
+        return webdriver.Chrome(service=service, options=self.options_factory())
+
+    def get(self, url: str, wait_for_body: int = 10):
+        """
+        Navigate the shared driver to `url` and return it.
+        Recycles the browser first if it has served `max_pages` pages.
+        """
+        if self._driver is not None and self.pages_served >= self.max_pages:
+            print(f"[+] Recycling browser after {self.pages_served} pages")
+            self.close()
+
+        driver = self.driver
+        try:
+            driver.get(url)
+            WebDriverWait(driver, wait_for_body).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+        except Exception:
+            # Browser may have crashed or hung; throw it away so the next page gets a fresh one
+            self.close()
+            raise
+        self.pages_served += 1
+        return driver
+
+    def reset(self):
+        """Discard the current driver after a failure inside a page."""
+        self.close()
+
+    def close(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+            self.pages_served = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ========================================
+# BOUNDED POOL OF BROWSER WORKERS
+# ========================================
+class ScrapePool:
+    """
+    Runs scrape jobs on `workers` threads, each borrowing its own BrowserSession.
+
+    A job that raises only affects its own item (it yields None and the
+    session it used is reset); the other workers keep going.
+    """
+
+    def __init__(self, workers: int = SCRAPE_WORKERS, max_pages: int = MAX_PAGES_PER_BROWSER):
+        self.workers = max(1, int(workers))
+        self._sessions = queue.Queue()
+        self._all_sessions = [BrowserSession(max_pages=max_pages) for _ in range(self.workers)]
+        for session in self._all_sessions:
+            self._sessions.put(session)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scraper")
+
+    def _run(self, fn, item):
+        session = self._sessions.get()
+        try:
+            return fn(item, session=session)
+        except Exception as e:
+            print(f"[!] Scrape worker failed: {e}")
+            session.reset()
+            return None
+        finally:
+            self._sessions.put(session)
+
+    def map(self, fn, items):
+        """
+        Call `fn(item, session=...)` for every item concurrently.
+        Yields results in input order as soon as each one is ready.
+        """
+        futures = [self._executor.submit(self._run, fn, item) for item in items]
+        for future in futures:
+            yield future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for session in self._all_sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_session = None
+
+
+def get_default_session() -> BrowserSession:
+    """Process-wide session borrowed by getPageData when none is passed."""
+    global _default_session
+    if _default_session is None:
+        _default_session = BrowserSession()
+        # callers never close it themselves, so don't leave Chrome running at exit
+        atexit.register(close_default_session)
+    return _default_session
+
+
+def close_default_session():
+    global _default_session
+    if _default_session is not None:
+        _default_session.close()
+        _default_session = None
@@ -0,0 +1,108 @@
+from urllib.parse import urlparse, parse_qs
+from typing import Optional
+import threading
+import hashlib
+import json
+import time
+import os
+
+# ========================================
+# ON-DISK PAGE CONTENT CACHE
+# ========================================
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(".cache", "pages"))
+PAGE_CACHE_TTL_HOURS = float(os.getenv("PAGE_CACHE_TTL_HOURS", "168"))  # one week
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "5000"))
+# web research snippets per advertiser page (same TTL and size limit as pages)
+RESEARCH_CACHE_DIR = os.getenv("RESEARCH_CACHE_DIR", os.path.join(".cache", "research"))
+
+
+def normalize_page_url(url: str) -> str:
+    """
+    https://www.facebook.com/ReadingCafe.Bookstore/?ref=x → readingcafe.bookstore
+    https://m.facebook.com/profile.php?id=123            → profile.php?id=123
+    """
+    url = url.strip()
+    parsed = urlparse(url if "://" in url else "https://" + url)
+    path = parsed.path.strip("/").lower()
+    if path == "profile.php":
+        page_id = parse_qs(parsed.query).get("id", [""])[0]
+        return f"profile.php?id={page_id}"
+    return path
+
+
+class PageCache:
+    """
+    Extracted page text keyed by normalized page URL, one JSON file per page.
+
+    Entries older than `ttl_hours` are treated as missing. The file mtime is
+    bumped on every hit, so when the cache grows past `max_entries` the least
+    recently used pages are evicted first.
+    """
+
+    def __init__(self, directory: str = PAGE_CACHE_DIR, ttl_hours: float = PAGE_CACHE_TTL_HOURS,
+                 max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        key = normalize_page_url(url)
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[str]:
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        try:
+            os.utime(path)  # LRU: mark as recently used
+        except OSError:
+            pass
+        return entry.get("text")
+
+    def put(self, url: str, text: str):
+        path = self._path(url)
+        entry = {"url": url, "key": normalize_page_url(url), "text": text, "fetched_at": time.time()}
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                       if name.endswith(".json")]
+            overflow = len(entries) - self.max_entries
+            if overflow <= 0:
+                return
+            entries.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+            for path in entries[:overflow]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_page_cache = None
+_research_cache = None
+
+
+def get_page_cache() -> PageCache:
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
+
+
+def get_research_cache() -> PageCache:
+    global _research_cache
+    if _research_cache is None:
+        _research_cache = PageCache(directory=RESEARCH_CACHE_DIR)
+    return _research_cache
@@ -1,8 +1,9 @@
-
-from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
 from langchain_classic.schema import HumanMessage
-from humanauto import chatDuckAIJson
-import time
+from .adparser import parse_ad_cards, split_ad_cards, LIBRARY_ID_RE, MD_LINK_RE, is_page_link
+from .llm import LLMBackend, get_backend, estimate_tokens
+from .llm_cache import cached_llm_call, print_llm_cache_stats
+from humanauto import split_valid
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 import json
 import re
@@ -11,41 +12,15 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-def extract_json_from_response(text: str) -> dict:
-    """
-    Extract JSON from LLM response that may contain additional text.
-    Looks for JSON between { and } brackets.
-    """
-    # Try to find JSON in code blocks first
-    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(1))
-        except:
-            pass
-    
-    # Try to find any JSON object in the text
-    # Find the first { and last }
-    first_brace = text.find('{')
-    last_brace = text.rfind('}')
-    
-    if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-        json_str = text[first_brace:last_brace + 1]
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            # Try to find nested JSON if the first attempt fails
-            # Look for the pattern {"ads": [...]}
-            pattern = r'\{\s*"ads"\s*:\s*\[.*?\]\s*\}'
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group(0))
-                except:
-                    pass
-    
-    # If all else fails, return empty ads structure
-    return {"ads": []}
+# bump when the extraction prompt changes so cached replies are not reused
+AD_EXTRACTION_PROMPT_VERSION = "ads-v1"
+# how many extraction prompts may run at once (also capped by the backend)
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "4"))
+# max estimated tokens of ad text per extraction prompt
+AD_CHUNK_TOKEN_BUDGET = int(os.getenv("AD_CHUNK_TOKEN_BUDGET", "1500"))
+# a reply without an "ads" list is asked again; ads missing these fields are dropped
+AD_REPLY_SCHEMA = {"ads": list}
+AD_ITEM_SCHEMA = {"advertiser": str, "advertiser_facebook_link": str}
 
 def load_existing_ads(output_file: str) -> List[Dict]:
     """Load existing ads from file if it exists."""
@@ -102,16 +77,83 @@ def save_ads_incremental(new_ads: List[Dict], output_file: str = "extracted_ads.
         return 0
 
 
-def process_large_ad_file(text: str, query: str = "minifan", output_file: str = "ads.json") -> dict:
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
+def split_on_ad_boundaries(text: str, max_tokens: int = AD_CHUNK_TOKEN_BUDGET) -> List[str]:
+    """
+    Pack whole ads into chunks of at most `max_tokens`, with no overlap.
+    Ads are cut on "Library ID:" markers (paragraphs if there are none);
+    only a single ad bigger than the budget is split further, on line breaks.
+    """
+    segments = split_ad_cards(text) or [p for p in re.split(r'\n\s*\n', text) if p.strip()]
+    max_chars = max_tokens * 3
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=3000, chunk_overlap=500)
-    chunks = splitter.split_text(text)
+    pieces = []
+    for segment in segments:
+        if estimate_tokens(segment) <= max_tokens:
+            pieces.append(segment)
+            continue
+        current = ""
+        for line in segment.splitlines(keepends=True):
+            while len(line) > max_chars:
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if len(current) + len(line) > max_chars and current:
+                pieces.append(current)
+                current = ""
+            current += line
+        if current:
+            pieces.append(current)
 
-    all_ads = []
-    for i, chunk in enumerate(chunks):
-        print(f"\nChunk {i+1}/{len(chunks)}")
-        prompt = f"""
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and estimate_tokens(current + "\n\n" + piece) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+AD_MARKERS = ("Sponsored", "Started running on", "See ad details", "Total active time")
+
+
+def has_ad_signal(chunk: str) -> bool:
+    """
+    Cheap check for whether a chunk can contain an ad at all, so navigation,
+    filter UI, footers and disclaimers never reach the LLM.
+    """
+    if LIBRARY_ID_RE.search(chunk):
+        return True
+    links = MD_LINK_RE.findall(chunk)
+    page_links = sum(1 for _, url in links if is_page_link(re.sub(r'\s+', '', url)))
+    if not page_links:
+        return False
+    if any(marker in chunk for marker in AD_MARKERS):
+        return True
+    # menus and footers are almost nothing but links
+    link_chars = sum(len(name) + len(url) + 4 for name, url in links)
+    return link_chars / max(len(chunk), 1) < 0.5
+
+
+def dedupe_ads(ads: List[Dict]) -> List[Dict]:
+    """Keep the first ad per library ID (ads without one are all kept)."""
+    seen_ids = set()
+    unique = []
+    for ad in ads:
+        lib_id = ad.get("library_id")
+        if lib_id and lib_id in seen_ids:
+            continue
+        if lib_id:
+            seen_ids.add(lib_id)
+        unique.append(ad)
+    return unique
+
+
+def _extract_chunk(chunk: str, query: str, backend: LLMBackend) -> List[Dict]:
+    prompt = f"""
     You are a data extraction AI specialized in parsing Facebook Ad Library data. 
 
     Your task is to:
@@ -155,22 +197,118 @@ def process_large_ad_file(text: str, query: str = "minifan", output_file: str =
     2. JSON data ONLY inside a ```json code block
     """
 
-        result = chatDuckAIJson(prompt)
-        ads = result.get("ads", [])
-        
-        if ads:
-            print(f"  Found {len(ads)} ads")
-            all_ads.extend(ads)
-        else:
-            print("  No ads")
+    result = cached_llm_call(backend, AD_EXTRACTION_PROMPT_VERSION, prompt,
+                             lambda p: backend.complete_json(p, schema=AD_REPLY_SCHEMA))
+    ads, invalid = split_valid(result.get("ads", []) or [], AD_ITEM_SCHEMA)
+    if invalid:
+        print(f"[-] Dropped {len(invalid)} extracted ad(s) without advertiser or page link")
+    return ads
+
+
+def process_large_ad_file(text: str, query: str = "minifan", output_file: str = "ads.json", use_llm_fallback: bool = True,
+                          backend: LLMBackend = None, workers: int = None) -> dict:
+    backend = backend or get_backend()
+
+    # Rule-based pass first: most cards are fully parseable without an LLM
+    all_ads, unparsed_cards = parse_ad_cards(text)
+    if all_ads or unparsed_cards:
+        print(f"Parsed {len(all_ads)} ads locally, {len(unparsed_cards)} card(s) left for the LLM")
+        text = "\n\n".join(unparsed_cards)
+    # (no "Library ID:" markers at all → unknown layout, let the LLM see everything)
+
+    chunks = []
+    if text.strip() and use_llm_fallback:
+        chunks = split_on_ad_boundaries(text)
+        kept = [chunk for chunk in chunks if has_ad_signal(chunk)]
+        if len(kept) < len(chunks):
+            print(f"Skipped {len(chunks) - len(kept)}/{len(chunks)} chunk(s) with no ad signal")
+        chunks = kept
+
+    # Chunks are independent: run up to `workers` prompts at once (capped by the backend)
+    workers = max(1, min(workers or LLM_WORKERS, backend.max_concurrency, len(chunks) or 1))
+    if chunks:
+        print(f"Extracting {len(chunks)} chunk(s) with {workers} worker(s)")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as executor:
+        futures = [executor.submit(_extract_chunk, chunk, query, backend) for chunk in chunks]
+        # results are merged in chunk order regardless of which finishes first
+        for i, future in enumerate(futures):
+            try:
+                ads = future.result()
+            except Exception as e:
+                print(f"Chunk {i+1}/{len(chunks)}: failed ({e})")
+                continue
+            if ads:
+                print(f"Chunk {i+1}/{len(chunks)}: found {len(ads)} ads")
+                all_ads.extend(ads)
+            else:
+                print(f"Chunk {i+1}/{len(chunks)}: no ads")
+
+    before = len(all_ads)
+    all_ads = dedupe_ads(all_ads)
+    if len(all_ads) < before:
+        print(f"Dropped {before - len(all_ads)} duplicate ad(s)")
+
+    # Save (output_file=None lets streaming callers save once at the end)
+    if output_file:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump({"ads": all_ads}, f, indent=2, ensure_ascii=False)
+
+    print(f"\nDONE: {len(all_ads)} ads → {output_file}")
+    print_llm_cache_stats()
+    return all_ads
+
+
+def process_ad_batches(batches, output_file: str = "extracted_ads.json", save_raw: bool = True) -> list:
+    """
+    Extract ads from a stream of ad-card text batches (see crawl_ad_library).
+    Each batch is processed as soon as it arrives; ads are deduped on library ID
+    across every query and everything is saved once at the end.
+    Args:
+        batches: Iterable of (query, country, items) tuples, where items are
+            ad card texts or, in capture mode, already-decoded ad dicts
+        output_file: Path to save extracted ads
+        save_raw: Also dump the raw card text to meta_ads_<query>_<country>.txt
+    Returns:
+        List of extracted ads
+    """
+    all_ads = []
+    seen_ids = set()
+    raw_files = {}
+    try:
+        for query, country, cards in batches:
+            if cards and isinstance(cards[0], dict):
+                # captured from GraphQL: nothing left to extract
+                batch_ads = cards
+                batch_text = "\n".join(json.dumps(ad, ensure_ascii=False) for ad in cards)
+            else:
+                batch_text = "\n\n".join(cards)
+                batch_ads = None
+            if save_raw:
+                key = (query, country)
+                if key not in raw_files:
+                    raw_files[key] = open(f"meta_ads_{query.replace(' ', '_')}_{country}.txt", "w", encoding="utf-8")
+                raw_files[key].write(batch_text + "\n\n")
 
-        time.sleep(3)  # Be gentle with Duck.ai
+            if batch_ads is None:
+                batch_ads = process_large_ad_file(batch_text, query=query, output_file=None)
+            for ad in batch_ads:
+                lib_id = ad.get("library_id")
+                if lib_id and lib_id in seen_ids:
+                    continue
+                if lib_id:
+                    seen_ids.add(lib_id)
+                ad.setdefault("query", query)
+                ad.setdefault("country", country)
+                all_ads.append(ad)
+    finally:
+        for f in raw_files.values():
+            f.close()
 
-    # Save
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump({"ads": all_ads}, f, indent=2, ensure_ascii=False)
 
     print(f"\nDONE: {len(all_ads)} ads → {output_file}")
+    print_summary(output_file)
     return all_ads
 
 def print_summary(output_file: str = "extracted_ads.json"):
@@ -1,41 +1,131 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 import time
 from langchain_classic.prompts import ChatPromptTemplate
 from langchain_classic.schema.output_parser import StrOutputParser
 import re
-from humanauto import chatDuckAIJson
 import json
 from ddgs import DDGS
+from requests.adapters import HTTPAdapter
+import requests
+import os
+from .browser import BrowserSession, get_default_session, DEFAULT_USER_AGENT
+from .cache import get_page_cache, get_research_cache, normalize_page_url
+from .llm import LLMBackend, get_backend, estimate_tokens
+from .llm_cache import cached_llm_call
+from .prompting import build_lead_context, LEAD_RESEARCH_SHARE
+from humanauto import split_valid
 from dotenv import load_dotenv
 load_dotenv()
 
-def scrape_facebook_with_popup_close_and_scroll(url, scroll_duration=10):
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-    )
-    # Optional: if using Chromium on Debian
-    # chrome_options.binary_location = "/usr/bin/chromium"
-
-    driver = webdriver.Chrome(options=chrome_options)
+# we only ever send this many characters of page text to the LLM
+PAGE_TEXT_BUDGET = 3000
+
+
+def clean_html_text(html: str) -> str:
+    # Parse with BeautifulSoup and clean
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "svg", "noscript", "header", "footer", "nav", "aside"]):
+        tag.decompose()
+    return soup.get_text(separator=" ", strip=True)
+
+
+# ========================================
+# HTTP FAST PATH
+# ========================================
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "1") not in ("0", "false", "False", "")
+# below this many useful characters we assume the plain GET missed the content
+HTTP_MIN_TEXT = int(os.getenv("HTTP_MIN_TEXT", "400"))
+LOGIN_WALL_MARKERS = (
+    "log in to facebook", "log into facebook", "you must log in", "create new account",
+)
+
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=1))
+_http.headers.update({
+    "User-Agent": DEFAULT_USER_AGENT,
+    "Accept-Language": "en-US,en;q=0.9",
+})
+
+
+def fetch_page_text_http(url: str, timeout: float = 8):
+    """
+    Plain GET of a page: meta description/title plus the cleaned body text.
+    Returns None on any network error.
+    """
     try:
-        print(f"[+] Loading page: {url}")
-        driver.get(url)
+        response = _http.get(url, timeout=timeout, allow_redirects=True)
+    except Exception as e:
+        print(f"[-] HTTP fetch failed for {url}: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    meta = []
+    for attrs in ({"property": "og:title"}, {"property": "og:description"}, {"name": "description"}):
+        tag = soup.find("meta", attrs=attrs)
+        if tag and tag.get("content") and tag["content"] not in meta:
+            meta.append(tag["content"].strip())
+    return " ".join(meta + [clean_html_text(response.text)]).strip()
+
+
+def is_useful_page_text(text: str) -> bool:
+    """Long enough and not just Facebook's login wall."""
+    if not text or len(text) < HTTP_MIN_TEXT:
+        return False
+    head = text[:HTTP_MIN_TEXT * 2].lower()
+    wall_hits = sum(marker in head for marker in LOGIN_WALL_MARKERS)
+    # a login wall with a real page behind it still has plenty of other text
+    return wall_hits == 0 or len(text) > HTTP_MIN_TEXT * 4
+
 
-        # Wait for body to appear
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
+def scroll_until_stable(driver, stall_window=1.5, max_duration=10, text_budget=None, step=0.2):
+    """
+    Scroll until the page stops growing instead of for a fixed time.
+
+    Args:
+        driver: Selenium driver already on the page.
+        stall_window (float): Stop once scrollHeight and text length haven't grown for this many seconds.
+        max_duration (float): Hard ceiling in seconds.
+        text_budget (int): Stop early once the body text is at least this long.
+        step (float): Seconds between scrolls.
+
+    Returns:
+        float: Seconds spent scrolling.
+    """
+    start_time = time.time()
+    last_growth = start_time
+    last_height, last_length = -1, -1
+
+    while time.time() - start_time < max_duration:
+        driver.execute_script("window.scrollBy(0, 1000);")
+        time.sleep(step)
+        height, length = driver.execute_script(
+            "return [document.body.scrollHeight, (document.body.innerText || '').length];"
         )
+        now = time.time()
+        if height > last_height or length > last_length:
+            last_height, last_length = height, length
+            last_growth = now
+        if text_budget and length >= text_budget:
+            print(f"[+] Text budget reached ({length} chars)")
+            break
+        if now - last_growth >= stall_window:
+            break
+
+    elapsed = time.time() - start_time
+    print(f"[+] Scrolled for {elapsed:.1f}s (height {last_height}, text {last_length} chars)")
+    return elapsed
+
+
+def scrape_facebook_with_popup_close_and_scroll(url, scroll_duration=10, session: BrowserSession = None,
+                                                scroll_mode="adaptive", stall_window=1.5,
+                                                text_budget=PAGE_TEXT_BUDGET * 2):
+    session = session or get_default_session()
+    try:
+        print(f"[+] Loading page: {url}")
+        driver = session.get(url)
 
         # Try to find and click any close button (case-insensitive aria-label)
         try:
@@ -52,41 +142,59 @@ def scrape_facebook_with_popup_close_and_scroll(url, scroll_duration=10):
         except Exception as e:
             print("[-] No 'Close' popup found or failed to click:", str(e))
 
-        # Scroll down for `scroll_duration` seconds
-        print(f"[+] Scrolling for {scroll_duration} seconds to load content...")
-        start_time = time.time()
-        while time.time() - start_time < scroll_duration:
-            driver.execute_script("window.scrollBy(0, 1000);")
-            time.sleep(0.2)  # small delay between scrolls
+        if scroll_mode == "adaptive":
+            # Scroll until growth stalls; `scroll_duration` becomes the hard ceiling.
+            # Raw body text still contains nav/footer we strip below, hence the 2x budget.
+            scroll_until_stable(driver, stall_window=stall_window, max_duration=scroll_duration,
+                                text_budget=text_budget)
+        else:
+            # Scroll down for `scroll_duration` seconds
+            print(f"[+] Scrolling for {scroll_duration} seconds to load content...")
+            start_time = time.time()
+            while time.time() - start_time < scroll_duration:
+                driver.execute_script("window.scrollBy(0, 1000);")
+                time.sleep(0.2)  # small delay between scrolls
 
         # Get body HTML after scrolling
         body_element = driver.find_element(By.TAG_NAME, "body")
         body_html = body_element.get_attribute("outerHTML")
 
-        # Parse with BeautifulSoup and clean
-        soup = BeautifulSoup(body_html, "html.parser")
-        for tag in soup(["script", "style", "svg", "noscript", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-
-        text = soup.get_text(separator=" ", strip=True)
-        return text
+        return clean_html_text(body_html)
 
     except Exception as e:
         print(f"[!] Error during scraping: {e}")
+        session.reset()
         return None
-    finally:
-        driver.quit()
 
 # get facebook page data
-def getPageData(page_url:str):
+def getPageData(page_url:str, session: BrowserSession = None, refresh: bool = False):
+    cache = get_page_cache()
+    if not refresh:
+        cached_text = cache.get(page_url)
+        if cached_text:
+            print(f"[+] Cache hit: {normalize_page_url(page_url)}")
+            return cached_text
+    if HTTP_FAST_PATH:
+        http_text = fetch_page_text_http(page_url)
+        if is_useful_page_text(http_text):
+            print(f"[+] HTTP fast path: {len(http_text)} chars from {page_url}")
+            cache.put(page_url, http_text)
+            return http_text
+        print("[-] HTTP result below quality threshold, using the browser")
     try:
         extracted_text = scrape_facebook_with_popup_close_and_scroll(
             url=page_url,
-            scroll_duration=10
+            scroll_duration=10,
+            session=session
         )
         if extracted_text:
             print("\n[+] Extracted Text (first 1500 characters):\n")
             print(extracted_text[:1500] + "..." if len(extracted_text) > 1500 else extracted_text)
+            # error pages and login walls would otherwise hide the page for the whole TTL
+            if is_useful_page_text(extracted_text):
+                cache.put(page_url, extracted_text)
+            else:
+                print("[-] Page text looks like an error page or login wall, not caching it")
             return extracted_text
         else:
             print("Failed to extract content.")
@@ -97,29 +205,11 @@ def getPageData(page_url:str):
 
 
 
-def analyze_facebook_lead(url: str, advertiser_name: str = "") -> any:
-    text = getPageData(url)
-    pagename = url.split("com/")[1].replace("/", "").strip()
-
-    if not text or len(text.strip()) < 50 or pagename.isdigit():
-        return {"probability": 0, "service": None, "reasoning": "Insufficient content"}
-
-    text = text[:3000]
-
-    # External research
-    research_text = ""
-    try:
-        query = f"{advertiser_name or pagename} site:.com OR site:.bd OR site:.io OR facebook.com"
-        with DDGS() as ddgs:
-            results = [r.get("body", "") + " " + r.get("title", "") for r in ddgs.text(query, max_results=5)]
-            research_text = "\n".join([r for r in results if len(r) > 50])
-    except:
-        research_text = ""
-
-    combined_content = f"Facebook Page Content:\n{text}\n\nExternal Research Data:\n{research_text}"
-
-    # Prompt template
-    prompt = """You are an elite B2B sales analyst helping a small digital agency based in Bangladesh.  
+# ========================================
+# LEAD SCORING
+# ========================================
+# Shared preamble for single and batched scoring prompts
+LEAD_SCORING_GUIDELINES = """You are an elite B2B sales analyst helping a small digital agency based in Bangladesh.  
 The agency offers only these four services:  
 1. AI automation / chatbot systems  
 2. E-commerce website development and maintenance  
@@ -137,6 +227,85 @@ Your job is to evaluate a business's Facebook page (and any available external d
   - It’s a local, active, professionally branded small or medium business  
   - Clear signs of digital presence (e.g., online store, contact form, recent posts)  
 
+"""
+# batched scoring packs pages into one prompt up to this many (estimated) tokens
+LEAD_BATCH_TOKEN_BUDGET = int(os.getenv("LEAD_BATCH_TOKEN_BUDGET", "6000"))
+LEAD_BATCH_SIZE = int(os.getenv("LEAD_BATCH_SIZE", "1"))
+# bump when a scoring prompt changes so cached replies are not reused
+LEAD_SCORE_PROMPT_VERSION = "lead-v3"
+LEAD_BATCH_PROMPT_VERSION = "lead-batch-v3"
+# search the web about each advertiser and put the snippets in the scoring prompt
+LEAD_RESEARCH = os.getenv("LEAD_RESEARCH", "1") not in ("0", "false", "False", "")
+
+
+def _score_value(value) -> int:
+    """78, "78", "78%" or 78.0 → 78 (raises ValueError otherwise)."""
+    return int(float(str(value).strip().rstrip("%")))
+
+
+def _is_score(value) -> bool:
+    try:
+        return 0 <= _score_value(value) <= 100
+    except (TypeError, ValueError):
+        return False
+
+
+# replies missing these are asked again (see humanauto/parsing.py)
+LEAD_SCORE_SCHEMA = {"Probability": _is_score, "Service": str, "Reasoning": str}
+LEAD_BATCH_ITEM_SCHEMA = {"id": (str, int), "Probability": _is_score, "Service": str, "Reasoning": str}
+
+
+def _normalize_score(data: dict) -> dict:
+    probability = _score_value(data.get("Probability", data.get("probability", 0)))
+    service = data.get("Service") or data.get("service")
+    reasoning = data.get("Reasoning") or data.get("reasoning")
+    return {
+        "probability": min(100, max(0, probability)) or 0,
+        "service": service or "",
+        "reasoning": reasoning or ""
+    }
+
+
+def lead_research(url: str, advertiser_name: str = "") -> list:
+    """
+    Web search snippets about an advertiser, cached per page. Search results
+    change from run to run, and they end up in the prompt (the LLM cache
+    key), so re-scoring an unchanged page must reuse the same snippets.
+    """
+    if not LEAD_RESEARCH or LEAD_RESEARCH_SHARE <= 0:
+        return []
+    cache = get_research_cache()
+    cached = cache.get(url)
+    if cached is not None:
+        return json.loads(cached)
+
+    pagename = normalize_page_url(url).replace("/", "")
+    try:
+        query = f"{advertiser_name or pagename} site:.com OR site:.bd OR site:.io OR facebook.com"
+        with DDGS() as ddgs:
+            research = [r.get("title", "") + " " + r.get("body", "") for r in ddgs.text(query, max_results=5)]
+    except:
+        # not cached, so the next run tries again
+        return []
+    cache.put(url, json.dumps(research, ensure_ascii=False))
+    return research
+
+
+def analyze_facebook_lead(url: str, advertiser_name: str = "", session: BrowserSession = None, page_text: str = None,
+                          backend: LLMBackend = None) -> any:
+    # page_text lets callers that already scraped the page (e.g. ScrapePool) skip the browser
+    text = page_text if page_text is not None else getPageData(url, session=session)
+    pagename = normalize_page_url(url).replace("/", "")
+
+    if not text or len(text.strip()) < 50 or pagename.isdigit():
+        return {"probability": 0, "service": None, "reasoning": "Insufficient content"}
+
+    context, usage = build_lead_context(text, lead_research(url, advertiser_name))
+    print(f"[+] Prompt context for {pagename}: {usage['page_tokens']} page + {usage['research_tokens']} research "
+          f"tokens of {usage['budget']} ({usage['page_dropped_tokens']} page tokens cut)")
+
+    # Prompt template
+    prompt = LEAD_SCORING_GUIDELINES + context + """
 **Output Rules (STRICT):**  
 - ALWAYS respond with a brief natural-language explanation **first**, then provide the JSON **strictly as a code block** using triple backticks (```json ... ```)  
 - NEVER output JSON as plain text—it must be wrapped in a code block  
@@ -149,9 +318,9 @@ Example of correct output:
 This business runs an active online clothing store with recent posts but lacks proper security headers. They’re likely to invest in maintenance and protection.  
 ```json
 {
-  "Probability": "78",
+  "Probability": 78,
   "Service": "Securing and maintaining existing online stores",
-  "Reasoning": "Active e-commerce store with visible contact info and recent updates, but shows signs of outdated security practices.",
+  "Reasoning": "Active e-commerce store with visible contact info and recent updates, but shows signs of outdated security practices."
 }
 
 
@@ -159,16 +328,12 @@ This business runs an active online clothing store with recent posts but lacks p
 ```"""
     
     try:
-        data = chatDuckAIJson(prompt)
-        probability = int(data.get("Probability", data.get("probability", 0)))
-        service = data.get("Service") or data.get("service")
-        reasoning = data.get("Reasoning") or data.get("reasoning")
-        
-        return {
-            "probability": min(100, max(0, probability)) or 0,
-            "service": service or "",
-            "reasoning": reasoning or ""
-        }
+        backend = backend or get_backend()
+        data = cached_llm_call(backend, LEAD_SCORE_PROMPT_VERSION, prompt,
+                               lambda p: backend.complete_json(p, schema=LEAD_SCORE_SCHEMA))
+        result = _normalize_score(data)
+        result["budget"] = usage
+        return result
 
     except Exception as e:
         return {"probability": 0, "service": None, "reasoning": f"Analysis failed: {str(e)}"}
@@ -176,3 +341,96 @@ This business runs an active online clothing store with recent posts but lacks p
 
 
 
+LEAD_BATCH_OUTPUT_RULES = """**Output Rules (STRICT):**  
+- You will receive several Facebook pages, each introduced by a line `### Page id: <id>`  
+- Score EVERY page independently using the guidelines above  
+- Respond with a JSON array **strictly as a code block** using triple backticks (```json ... ```)  
+- The array must contain one object per page with exactly these keys: "id", "Probability", "Service", "Reasoning"  
+- "id" must be copied exactly from the page header  
+- "Probability" must be an integer from 0 to 100  
+- "Service" must be one of the four exact service names listed above  
+- "Reasoning" must be 1–2 concise, realistic sentences  
+
+"""
+
+
+def _pack_batches(items: list, batch_size: int, token_budget: int) -> list:
+    """Greedy split into batches of at most batch_size items and token_budget tokens."""
+    base = estimate_tokens(LEAD_SCORING_GUIDELINES + LEAD_BATCH_OUTPUT_RULES)
+    batches, current, used = [], [], base
+    for item in items:
+        cost = estimate_tokens(item["text"]) + 10
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], base
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def score_leads_batch(leads: list, batch_size: int = 5, token_budget: int = LEAD_BATCH_TOKEN_BUDGET,
+                      backend: LLMBackend = None) -> list:
+    """
+    Score several already-scraped pages with one prompt per batch.
+
+    Args:
+        leads (list): dicts with "url", "advertiser" and "text" (page text).
+        batch_size (int): Max pages per prompt.
+        token_budget (int): Max estimated tokens per prompt; batches are split to fit.
+        backend (LLMBackend): Defaults to the configured backend.
+
+    Returns:
+        list: One result dict per lead, in input order (same shape as analyze_facebook_lead).
+            Pages missing or malformed in the reply are re-scored one by one.
+    """
+    backend = backend or get_backend()
+    results = [None] * len(leads)
+    items = []
+    used_ids = set()
+
+    for index, lead in enumerate(leads):
+        text = lead.get("text") or ""
+        pagename = normalize_page_url(lead["url"]).replace("/", "")
+        if len(text.strip()) < 50 or pagename.isdigit():
+            results[index] = {"probability": 0, "service": None, "reasoning": "Insufficient content"}
+            continue
+        page_id = pagename or f"page{index}"
+        while page_id in used_ids:
+            page_id += f"-{index}"
+        used_ids.add(page_id)
+        # same per-page budget as a single prompt, research included
+        context, usage = build_lead_context(text, lead_research(lead["url"], lead.get("advertiser", "")),
+                                            heading="####")
+        items.append({"index": index, "id": page_id, "text": context, "usage": usage})
+
+    for batch in _pack_batches(items, batch_size, token_budget):
+        pages = "\n\n".join(f"### Page id: {item['id']}\n{item['text']}" for item in batch)
+        prompt = LEAD_SCORING_GUIDELINES + LEAD_BATCH_OUTPUT_RULES + "### Pages\n\n" + pages
+        print(f"[+] Scoring {len(batch)} page(s) in one prompt (~{estimate_tokens(prompt)} tokens)")
+
+        try:
+            entries = cached_llm_call(backend, LEAD_BATCH_PROMPT_VERSION, prompt,
+                                      lambda p: backend.complete_json(p, expect=list))
+        except Exception as e:
+            print(f"[!] Batch scoring failed: {e}")
+            entries = []
+        valid, invalid = split_valid(entries, LEAD_BATCH_ITEM_SCHEMA)
+        if invalid:
+            print(f"[-] {len(invalid)} malformed entr(ies) in the batch reply")
+        by_id = {str(entry.get("id")): entry for entry in valid}
+
+        for item in batch:
+            entry = by_id.get(item["id"])
+            try:
+                results[item["index"]] = dict(_normalize_score(entry), budget=item["usage"])
+            except Exception:
+                # missing or malformed entry: fall back to a single-page prompt
+                lead = leads[item["index"]]
+                print(f"[-] No valid batch score for {item['id']}, scoring it alone")
+                results[item["index"]] = analyze_facebook_lead(
+                    lead["url"], lead.get("advertiser", ""), page_text=lead.get("text") or "", backend=backend
+                )
+
+    return results
@@ -0,0 +1,228 @@
+from humanauto.parsing import extract_json, schema_errors
+from requests.adapters import HTTPAdapter
+import requests
+import hashlib
+import atexit
+import json
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# duckai | duckai-xvfb | http | local | stub
+LLM_BACKEND = os.getenv("LLM_BACKEND", "duckai")
+# keep one Duck.ai window open across prompts instead of one window per prompt
+DUCKAI_SESSION = os.getenv("DUCKAI_SESSION", "1") not in ("0", "false", "False", "")
+
+
+def extract_json_from_response(text: str) -> dict:
+    """
+    Extract JSON from LLM response that may contain additional text.
+    Uses the tolerant parser in humanauto/parsing.py (code fences, trailing
+    commas, quote repair, truncated arrays).
+    """
+    data = extract_json(text, expect=dict)
+    if data is not None:
+        return data
+    # a bare array is taken as the ads list
+    ads = extract_json(text, expect=list)
+    # If all else fails, return empty ads structure
+    return {"ads": ads or []}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~3 chars/token is conservative for mixed English/Bangla text
+    return len(text) // 3 + 1
+
+
+# ========================================
+# BACKEND INTERFACE
+# ========================================
+class LLMBackend:
+    """
+    Anything that turns a prompt into text.
+
+    `max_concurrency` says how many prompts may be in flight at once and
+    `cooldown` how long the backend pauses after each real call (GUI
+    backends need both).
+    """
+    name = "base"
+    max_concurrency = 1
+    cooldown = 0.0
+
+    @property
+    def cache_identity(self) -> str:
+        """What makes replies from this backend distinct (used by the LLM cache)."""
+        return self.name
+
+    def complete(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def complete_json(self, prompt: str, schema: dict = None, expect: type = dict):
+        """
+        Parsed JSON reply: an object, or an array when expect=list (batched
+        scoring). A reply with no JSON of that type, or an object that
+        doesn't satisfy the schema (see humanauto/parsing.py), is asked once
+        more, then given up as an empty {} / [].
+        """
+        for attempt in range(2):
+            reply = self.complete(prompt)
+            data = extract_json(reply, expect=expect)
+            if data is None:
+                errors = [f"no JSON {expect.__name__} in reply"]
+            else:
+                errors = schema_errors(data, schema) if schema and expect is dict else []
+            if not errors:
+                return data
+            print(f"[-] {self.name} reply failed validation ({', '.join(errors)}), attempt {attempt + 1}/2")
+        return expect()
+
+
+class DuckAIGUIBackend(LLMBackend):
+    """
+    The original pyautogui-driven Duck.ai chat (one prompt per screen).
+
+    With `persistent` (DUCKAI_SESSION=1, the default) the chat window stays
+    open between prompts and is closed when the program exits.
+    """
+    name = "duckai"
+    max_concurrency = 1
+    cooldown = 3.0  # Be gentle with Duck.ai
+
+    def __init__(self, persistent: bool = DUCKAI_SESSION):
+        from humanauto import DuckAISession  # GUI stack, only when this backend is picked
+        self.session = DuckAISession() if persistent else None
+        if self.session is not None:
+            atexit.register(self.session.close)
+
+    def complete(self, prompt: str) -> str:
+        return json.dumps(self.complete_json(prompt), ensure_ascii=False)
+
+    def complete_json(self, prompt: str, schema: dict = None, expect: type = dict):
+        from humanauto import chatDuckAIJson
+        data = chatDuckAIJson(prompt, session=self.session, schema=schema, expect=expect)
+        time.sleep(self.cooldown)
+        return data if data is not None else expect()
+
+
+class DuckAIDisplaysBackend(DuckAIGUIBackend):
+    """
+    Several Duck.ai sessions in parallel, one per Xvfb display (GUI_DISPLAYS
+    of them), for headless boxes. Replies are cached under the same identity
+    as the single-screen backend since it's the same chat.
+    """
+    name = "duckai-xvfb"
+
+    def __init__(self, displays: int = None):
+        from humanauto import DisplayPool
+        self.session = None
+        self.pool = DisplayPool(displays) if displays else DisplayPool()
+        self.max_concurrency = self.pool.size
+        atexit.register(self.pool.close)
+
+    @property
+    def cache_identity(self) -> str:
+        return DuckAIGUIBackend.name
+
+    def complete_json(self, prompt: str, schema: dict = None, expect: type = dict):
+        data = self.pool.ask(prompt, schema=schema, expect=expect)
+        time.sleep(self.cooldown)
+        return data if data is not None else expect()
+
+
+class HTTPChatBackend(LLMBackend):
+    """Any OpenAI-compatible /chat/completions endpoint."""
+    name = "http"
+
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = None,
+                 timeout: float = 120, max_concurrency: int = None):
+        self.base_url = (base_url or os.getenv("LLM_API_URL", "https://api.openai.com/v1")).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("LLM_API_KEY", "")
+        self.model = model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_CONCURRENCY", "4"))
+        self._http = requests.Session()
+        self._http.mount(self.base_url, HTTPAdapter(pool_maxsize=max(self.max_concurrency, 1)))
+        if self.api_key:
+            self._http.headers["Authorization"] = f"Bearer {self.api_key}"
+
+    @property
+    def cache_identity(self) -> str:
+        return f"{self.name}:{self.base_url}:{self.model}"
+
+    def complete(self, prompt: str) -> str:
+        response = self._http.post(
+            f"{self.base_url}/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0,
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class LocalModelBackend(HTTPChatBackend):
+    """A local model server speaking the OpenAI API (Ollama, llama.cpp, vLLM...)."""
+    name = "local"
+
+    def __init__(self, base_url: str = None, model: str = None, **kwargs):
+        super().__init__(
+            base_url=base_url or os.getenv("LOCAL_LLM_URL", "http://localhost:11434/v1"),
+            api_key="",
+            model=model or os.getenv("LOCAL_LLM_MODEL", "llama3.1"),
+            max_concurrency=kwargs.pop("max_concurrency", None) or int(os.getenv("LOCAL_LLM_CONCURRENCY", "2")),
+            **kwargs,
+        )
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic backend for tests and dry runs.
+
+    `responses` maps a substring of the prompt to the reply to return; without
+    a match, extraction prompts get no ads and scoring prompts get a score
+    derived from the prompt hash (same prompt → same score).
+    """
+    name = "stub"
+    max_concurrency = 8
+
+    def __init__(self, responses: dict = None):
+        self.responses = responses or {}
+        self.calls = []
+
+    def complete(self, prompt: str) -> str:
+        self.calls.append(prompt)
+        for needle, reply in self.responses.items():
+            if needle in prompt:
+                return reply if isinstance(reply, str) else "```json\n" + json.dumps(reply) + "\n```"
+        if '"Probability"' in prompt:
+            score = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16) % 101
+            reply = {"Probability": score, "Service": "E-commerce website development and maintenance",
+                     "Reasoning": "Stub score."}
+        else:
+            reply = {"ads": []}
+        return "```json\n" + json.dumps(reply) + "\n```"
+
+
+BACKENDS = {
+    "duckai": DuckAIGUIBackend,
+    "duckai-xvfb": DuckAIDisplaysBackend,
+    "http": HTTPChatBackend,
+    "local": LocalModelBackend,
+    "stub": StubBackend,
+}
+_backends = {}
+
+
+def get_backend(name: str = None) -> LLMBackend:
+    """Shared backend instance selected by name or the LLM_BACKEND env var."""
+    name = (name or LLM_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
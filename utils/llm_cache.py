@@ -0,0 +1,145 @@
+from typing import Any, Callable, Optional
+import threading
+import hashlib
+import sqlite3
+import json
+import time
+import os
+
+# ========================================
+# CONTENT-ADDRESSED LLM RESPONSE CACHE
+# ========================================
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") not in ("0", "false", "False", "")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+# run eviction every this many writes
+_EVICT_EVERY = 100
+
+
+class LLMCache:
+    """
+    Parsed LLM replies stored in SQLite, keyed by
+    sha256(backend identity + prompt template version + prompt).
+
+    Entries older than `max_age_days` are dropped and, past `max_entries`,
+    the least recently used ones go first. Bump a template version constant
+    whenever its prompt wording changes so old replies stop matching.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 max_age_days: float = LLM_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " backend TEXT,"
+            " template_version TEXT,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(backend_identity: str, template_version: str, prompt: str) -> str:
+        payload = "\0".join([backend_identity, template_version, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any, backend_identity: str = "", template_version: str = ""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, backend, template_version, response, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, backend_identity, template_version, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % _EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Shared cache, or None when LLM_CACHE=0."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+    return _llm_cache
+
+
+def cached_llm_call(backend, template_version: str, prompt: str, call: Callable[[str], Any]) -> Any:
+    """
+    Return the cached parsed reply for this backend/template/prompt, or run
+    `call(prompt)` and cache its result. Failed replies (None, {}, []) and
+    ones salvaged from a cut-off reply (`.partial`, see humanauto/parsing.py)
+    are not cached, so they get another chance next run.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return call(prompt)
+
+    identity = backend.cache_identity
+    key = cache.make_key(identity, template_version, prompt)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = call(prompt)
+    if result and not getattr(result, "partial", False):
+        cache.put(key, result, backend_identity=identity, template_version=template_version)
+    return result
+
+
+def print_llm_cache_stats():
+    cache = get_llm_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
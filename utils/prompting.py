@@ -0,0 +1,101 @@
+from typing import List, Tuple
+import re
+import os
+from .llm import estimate_tokens
+
+# ========================================
+# TOKEN-BUDGETED LEAD PROMPT CONTEXT
+# ========================================
+# estimated tokens of page text + research allowed in one scoring prompt
+LEAD_CONTEXT_TOKENS = int(os.getenv("LEAD_CONTEXT_TOKENS", "1400"))
+# share of the context budget reserved for research; whatever one side
+# doesn't use goes to the other
+LEAD_RESEARCH_SHARE = float(os.getenv("LEAD_RESEARCH_SHARE", "0.3"))
+# longest single research snippet kept (in characters)
+RESEARCH_SNIPPET_CHARS = 300
+
+# Facebook UI text that says nothing about the business
+BOILERPLATE_RE = re.compile(
+    r'\b(?:Like|Comment|Share|Reply|Send|Follow|Message|See more|See less|See all|See translation|'
+    r'Most relevant|All reactions:?|Write a comment…?|Log in|Forgot account\?|Create new account|'
+    r'Not now|Sponsored|Edited|Author)\b'
+    r'(?:\s*[·•]?\s*\b(?:Like|Comment|Share|Reply|Send|Follow|Message|See more|See less|See all|'
+    r'See translation|Most relevant|All reactions:?|Write a comment…?|Log in|Forgot account\?|'
+    r'Create new account|Not now|Sponsored|Edited|Author)\b)+',
+    re.IGNORECASE,
+)
+SEGMENT_SPLIT_RE = re.compile(r'\s*(?:[·•|]|\n|\s{2,})\s*')
+
+
+def dedupe_boilerplate(text: str) -> str:
+    """
+    Drop runs of UI labels ("Like · Comment · Share") and any segment that
+    already appeared earlier (menus, repeated post footers, headers).
+    """
+    text = BOILERPLATE_RE.sub(" ", text or "")
+    seen, kept = set(), []
+    for segment in SEGMENT_SPLIT_RE.split(text):
+        key = re.sub(r'\W+', ' ', segment).strip().lower()
+        if len(key) < 2 or key in seen:
+            continue
+        seen.add(key)
+        kept.append(segment.strip())
+    return " · ".join(kept)
+
+
+def clip_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to about `tokens` estimated tokens, at a word boundary."""
+    if tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= tokens:
+        return text
+    clipped = text[:tokens * 3]
+    return clipped[:clipped.rfind(" ")] if " " in clipped else clipped
+
+
+def _research_block(snippets: List[str]) -> str:
+    seen, lines = set(), []
+    for snippet in snippets:
+        snippet = re.sub(r'\s+', ' ', snippet or "").strip()[:RESEARCH_SNIPPET_CHARS]
+        key = snippet.lower()[:80]
+        if len(snippet) > 50 and key not in seen:
+            seen.add(key)
+            lines.append(f"- {snippet}")
+    return "\n".join(lines)
+
+
+def build_lead_context(page_text: str, research: List[str] = None, budget: int = LEAD_CONTEXT_TOKENS,
+                       research_share: float = LEAD_RESEARCH_SHARE, heading: str = "###") -> Tuple[str, dict]:
+    """
+    Page text and research snippets for a scoring prompt, fitted to `budget`.
+
+    Args:
+        page_text (str): Scraped page text.
+        research (list): Search result snippets (may be empty).
+        budget (int): Max estimated tokens for both together.
+        research_share (float): Part of the budget research may claim.
+        heading (str): Markdown heading marker for the two sections.
+
+    Returns:
+        (context, usage): the text block to put in the prompt, and
+            {"budget", "page_tokens", "research_tokens", "page_dropped_tokens"}.
+    """
+    page = dedupe_boilerplate(page_text)
+    notes = _research_block(research or [])
+
+    research_cap = int(budget * research_share) if notes else 0
+    page_cap = budget - min(research_cap, estimate_tokens(notes) if notes else 0)
+    page_part = clip_to_tokens(page, page_cap)
+    notes_part = clip_to_tokens(notes, budget - estimate_tokens(page_part)) if notes else ""
+
+    context = f"{heading} Facebook Page Content\n{page_part}\n"
+    if notes_part:
+        context += f"\n{heading} External Research\n{notes_part}\n"
+
+    usage = {
+        "budget": budget,
+        "page_tokens": estimate_tokens(page_part),
+        "research_tokens": estimate_tokens(notes_part) if notes_part else 0,
+        "page_dropped_tokens": max(0, estimate_tokens(page) - estimate_tokens(page_part)),
+    }
+    return context, usage
@@ -4,13 +4,16 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-from .facebook import analyze_facebook_lead
+from .facebook import analyze_facebook_lead, getPageData, score_leads_batch, LEAD_BATCH_SIZE
+from .browser import ScrapePool, SCRAPE_WORKERS
 from .data_ai import process_text_data
+from functools import partial
 import urllib.parse
 import html2text
 import re
 import pandas as pd
 from .database import LeadDB, LeadModel
+from .llm_cache import print_llm_cache_stats
 import json
 import csv
 import requests
@@ -94,7 +97,7 @@ def analyze_website_issues(website_url: str) -> str:
 # 2. CONVERSION METRICS ESTIMATOR
 # ========================================
 def estimate_conversion_metrics(ad: dict, website_issues: str = "") -> dict:
-    text = (ad.get('ad_text', '') + ad.get('page_bio', '') + ad.get('advertiser', '')).lower()
+    text = (ad.get('ad_text', '') + ad.get('page_bio', '') + (ad.get('advertiser') or '')).lower()
     metrics = {
         "Est. Daily Orders": "Unknown",
         "Ad Spend Intensity": "Low",
@@ -245,102 +248,176 @@ def infer_service_from_name(name: str) -> str:
             return service
     return "E-commerce"
 
-def proccess_leads(ads_array: list):
+def _prepare_candidate(ad: dict, seen_keys: set):
+    """
+    Validate & clean one ad before any page is scraped.
+    Returns a candidate dict, or None if the ad should be skipped.
+    """
+    advertiser = (ad.get('advertiser') or 'Unknown').strip()
+
+    # === EXTRACT & CLEAN ===
+    fb_link = str(ad.get('advertiser_facebook_link') or "").strip()
+    if not fb_link or "facebook.com" not in fb_link:
+        print(f"  [SKIP] Invalid FB link: {fb_link}")
+        return None
+
+    # Extract pagename
+    try:
+        pagename = fb_link.split("facebook.com/")[1].split("?")[0].split("#")[0].rstrip("/")
+        if pagename.isdigit():
+            return None
+    except:
+        return None
+
+    # === WEBSITE ===
+    website_raw = ad.get('advertiser_website_link', '')
+    website = ""
+    if isinstance(website_raw, str):
+        website = website_raw.strip()
+        if website.lower() in ["", "none", "null", "fb only"]:
+            website = ""
+        elif not website.startswith(("http://", "https://")):
+            website = "https://" + website
+
+    # === LIBRARY ID ===
+    library_id = str(ad.get('library_id') or f"fb_{int(time.time())}_{hash(fb_link) % 10000}")
+
+    # === DUPLICATE CHECK ===
+    dedupe_key = (fb_link, library_id)
+    if dedupe_key in seen_keys:
+        print(f"  [DUPLICATE] Skipped: {advertiser}")
+        return None
+    seen_keys.add(dedupe_key)
+
+    return {
+        "ad": ad,
+        "advertiser": advertiser,
+        "fb_link": fb_link,
+        "website": website,
+        "library_id": library_id,
+    }
+
+
+def _build_lead(candidate: dict, lead_result: dict) -> dict:
+    ad = candidate["ad"]
+    advertiser = candidate["advertiser"]
+    website = candidate["website"]
+
+    # === SERVICE (NEVER NULL) ===
+    service_raw = lead_result.get('service', '') or ''
+    service = str(service_raw).strip().title()
+    if not service or service.lower() in ["unknown", "none", ""]:
+        service = infer_service_from_name(advertiser) or "E-commerce"
+
+    # === WEBSITE ISSUES ===
+    issues = ""
+    if any(x in service.lower() for x in ["security", "maintenance", "audit", "ssl"]):
+        if website:
+            issues = analyze_website_issues(website)
+            time.sleep(1)
+        else:
+            issues = "FB-only store — perfect for AI Chatbot + Auto-Order System"
+    else:
+        issues = "Service-based — website optional"
+
+    # === METRICS ===
+    metrics = estimate_conversion_metrics(ad, issues)
+
+    # === BUILD LEAD (GUARANTEED VALID) ===
+    lead = {
+        "advertiser": advertiser,
+        "facebook_link": candidate["fb_link"],
+        "website_link": website or "FB Only",
+        "contact": str(ad.get('contact') or "").strip(),
+        "library_id": candidate["library_id"],
+        "probability": max(0, int(lead_result.get('probability', 0))),
+        "service": service,  # ← NEVER NULL, NEVER None
+        "reasoning": str(lead_result.get('reasoning', '')).strip(),
+        "issues": issues,
+        "status": "new",
+        "tags": lead_result.get('tags', ['fb-ad']),
+        # estimated tokens of page text / research that went into the scoring prompt
+        "prompt_budget": lead_result.get('budget') or {},
+        **metrics
+    }
+
+    # === PITCH & WHATSAPP ===
+    pitch_row = LeadModel.default_pitch_row(lead)
+    pitch, wa_link = generate_pitch_and_link(pitch_row)
+    lead["pitch"] = pitch
+    lead["whatsapp_link"] = wa_link or ""
+
+    # === FINAL VALIDATION ===
+    if not lead["service"]:
+        lead["service"] = "E-commerce"
+
+    return lead
+
+
+def _scrape_candidate(candidate: dict, session=None, refresh: bool = False) -> str:
+    return getPageData(candidate["fb_link"], session=session, refresh=refresh)
+
+
+def _score_candidates(pairs, batch_size: int = 1):
+    """
+    Score (candidate, page_text) pairs in order, one prompt per lead or
+    `batch_size` leads per prompt. Yields (candidate, lead_result).
+    """
+    if batch_size <= 1:
+        for candidate, page_text in pairs:
+            print(f"→ Analyzing: {candidate['advertiser']}")
+            yield candidate, analyze_facebook_lead(candidate["fb_link"], candidate["advertiser"], page_text=page_text or "")
+        return
+
+    group = []
+    for pair in pairs:
+        group.append(pair)
+        if len(group) >= batch_size:
+            yield from _score_group(group, batch_size)
+            group = []
+    if group:
+        yield from _score_group(group, batch_size)
+
+
+def _score_group(group, batch_size):
+    print(f"→ Analyzing: {', '.join(c['advertiser'] for c, _ in group)}")
+    lead_results = score_leads_batch(
+        [{"url": c["fb_link"], "advertiser": c["advertiser"], "text": t or ""} for c, t in group],
+        batch_size=batch_size,
+    )
+    for (candidate, _), lead_result in zip(group, lead_results):
+        yield candidate, lead_result
+
+
+def proccess_leads(ads_array: list, workers: int = SCRAPE_WORKERS, refresh: bool = False,
+                   score_batch_size: int = LEAD_BATCH_SIZE):
+    """
+    Scrape, score and save every ad's advertiser page.
+
+    Pages are scraped by a pool of `workers` browsers while scoring runs in
+    input order on the main thread, so the LLM is never waiting on Chrome.
+    Pages scraped recently come from the page cache unless `refresh` is set.
+    With `score_batch_size` > 1 several pages share one scoring prompt.
+    """
     db = LeadDB()
     results = []
     seen_keys = set()
 
     print("Starting FB Lead Analysis → MongoDB Atlas")
 
-    for ad in ads_array:
-        advertiser = ad.get('advertiser', 'Unknown').strip()
-        print(f"→ Analyzing: {advertiser}")
-
-        # === EXTRACT & CLEAN ===
-        fb_link = str(ad.get('advertiser_facebook_link') or "").strip()
-        if not fb_link or "facebook.com" not in fb_link:
-            print(f"  [SKIP] Invalid FB link: {fb_link}")
-            continue
-
-        # Extract pagename
-        try:
-            pagename = fb_link.split("facebook.com/")[1].split("?")[0].split("#")[0].rstrip("/")
-            if pagename.isdigit():
-                continue
-        except:
-            continue
-
-        # === WEBSITE ===
-        website_raw = ad.get('advertiser_website_link', '')
-        website = ""
-        if isinstance(website_raw, str):
-            website = website_raw.strip()
-            if website.lower() in ["", "none", "null", "fb only"]:
-                website = ""
-            elif not website.startswith(("http://", "https://")):
-                website = "https://" + website
-
-        # === LIBRARY ID ===
-        library_id = str(ad.get('library_id') or f"fb_{int(time.time())}_{hash(fb_link) % 10000}")
-
-        # === DUPLICATE CHECK ===
-        dedupe_key = (fb_link, library_id)
-        if dedupe_key in seen_keys:
-            print(f"  [DUPLICATE] Skipped: {advertiser}")
-            continue
-        seen_keys.add(dedupe_key)
+    candidates = [c for c in (_prepare_candidate(ad, seen_keys) for ad in ads_array) if c]
+    print(f"[+] {len(candidates)} pages to analyze with {workers} browser worker(s)")
 
+    pool = ScrapePool(workers=workers)
+    try:
+        pages = zip(candidates, pool.map(partial(_scrape_candidate, refresh=refresh), candidates))
         # === FB ANALYSIS ===
-        lead_result = analyze_facebook_lead(fb_link, advertiser)
-        time.sleep(2)
-
-        # === SERVICE (NEVER NULL) ===
-        service_raw = lead_result.get('service', '') or ''
-        service = str(service_raw).strip().title()
-        if not service or service.lower() in ["unknown", "none", ""]:
-            service = infer_service_from_name(advertiser) or "E-commerce"
-
-        # === WEBSITE ISSUES ===
-        issues = ""
-        if any(x in service.lower() for x in ["security", "maintenance", "audit", "ssl"]):
-            if website:
-                issues = analyze_website_issues(website)
-                time.sleep(1)
-            else:
-                issues = "FB-only store — perfect for AI Chatbot + Auto-Order System"
-        else:
-            issues = "Service-based — website optional"
-
-        # === METRICS ===
-        metrics = estimate_conversion_metrics(ad, issues)
-
-        # === BUILD LEAD (GUARANTEED VALID) ===
-        lead = {
-            "advertiser": advertiser,
-            "facebook_link": fb_link,
-            "website_link": website or "FB Only",
-            "contact": str(ad.get('contact') or "").strip(),
-            "library_id": library_id,
-            "probability": max(0, int(lead_result.get('probability', 0))),
-            "service": service,  # ← NEVER NULL, NEVER None
-            "reasoning": str(lead_result.get('reasoning', '')).strip(),
-            "issues": issues,
-            "status": "new",
-            "tags": lead_result.get('tags', ['fb-ad']),
-            **metrics
-        }
-
-        # === PITCH & WHATSAPP ===
-        pitch_row = LeadModel.default_pitch_row(lead)
-        pitch, wa_link = generate_pitch_and_link(pitch_row)
-        lead["pitch"] = pitch
-        lead["whatsapp_link"] = wa_link or ""
-
-        # === FINAL VALIDATION ===
-        if not lead["service"]:
-            lead["service"] = "E-commerce"
-
-        results.append(lead)
+        for candidate, lead_result in _score_candidates(pages, score_batch_size):
+            results.append(_build_lead(candidate, lead_result))
+    finally:
+        pool.close()
+    print_llm_cache_stats()
+
     print(results)
     # === SAVE TO MONGODB ===
     if results: